@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+
+TOKEN_VERSION_KEY = 'token_version:{}'
+# Поля пользователя, которые записываются в токен при выдаче.
+USER_CLAIMS = ('role', 'is_superuser', 'token_version')
+
+
+def get_access_token(user):
+    """Access-токен с ролью и версией токенов пользователя в claims."""
+    token = AccessToken.for_user(user)
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def set_token_version(user_id, version):
+    cache.set(TOKEN_VERSION_KEY.format(user_id), version,
+              settings.TOKEN_VERSION_CACHE_TIMEOUT)
+
+
+def forget_token_version(user_id):
+    cache.delete(TOKEN_VERSION_KEY.format(user_id))
+
+
+def get_token_version(user_id):
+    """Текущая версия токенов пользователя из кэша; None, если
+    пользователя нет."""
+    version = cache.get(TOKEN_VERSION_KEY.format(user_id))
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list(
+            'token_version', flat=True
+        ).first()
+        if version is not None:
+            set_token_version(user_id, version)
+    return version
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без чтения пользователя из БД.
+
+    Если в токене есть claims из ``USER_CLAIMS``, пользователь собирается
+    из них как частично загруженный объект: остальные поля подгружаются
+    одним запросом при первом обращении. Токен отклоняется, если версия
+    в нём не совпадает с текущей версией пользователя (её меняет смена
+    роли, прав суперпользователя или активности). Токены без
+    claims проверяются как раньше, с загрузкой пользователя.
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if get_token_version(user_id) != validated_token['token_version']:
+            raise AuthenticationFailed('Токен отозван',
+                                       code='token_revoked')
+        claims = {api_settings.USER_ID_FIELD: user_id, **{
+            claim: validated_token[claim] for claim in USER_CLAIMS
+        }}
+        names = [field.attname for field in User._meta.concrete_fields
+                 if field.attname in claims]
+        return User.from_db(None, names, [claims[name] for name in names])
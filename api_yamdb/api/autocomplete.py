@@ -0,0 +1,64 @@
+from bisect import bisect_left, insort
+
+from reviews.models import Title
+from .indexes import InMemoryIndex
+from .normalization import normalize
+
+# Больше любого символа: все ключи с префиксом p лежат до (p + MAX_CHAR,).
+MAX_CHAR = '\U0010ffff'
+
+
+class TitlePrefixIndex(InMemoryIndex):
+    """Отсортированный в памяти процесса индекс названий произведений.
+
+    Хранит пары ``(нормализованное название, id)`` в списке, поиск по
+    префиксу - двоичный поиск и срез. Устаревший индекс продолжает
+    отвечать, пока не перестроится.
+    """
+    models = (Title,)
+    rebuild_interval_setting = 'AUTOCOMPLETE_REBUILD_INTERVAL'
+
+    def empty_state(self):
+        return {'keys': [], 'names': {}}
+
+    def load(self):
+        rows = Title.objects.values_list('pk', 'name').iterator()
+        names = {pk: name for pk, name in rows}
+        keys = sorted((normalize(name), pk) for pk, name in names.items())
+        return {'keys': keys, 'names': names}
+
+    def discard(self, pk):
+        name = self.names.pop(pk, None)
+        if name is None:
+            return
+        index = bisect_left(self.keys, (normalize(name), pk))
+        if index < len(self.keys) and self.keys[index][1] == pk:
+            del self.keys[index]
+
+    def update(self, titles, deleted=False):
+        """Вносит изменённые или удалённые ``(id, название)``."""
+        if not self.can_update():
+            return
+        with self.lock:
+            for pk, name in titles:
+                self.discard(pk)
+                if not deleted:
+                    self.names[pk] = name
+                    insort(self.keys, (normalize(name), pk))
+            self.mark_synced()
+
+    def search(self, prefix, limit):
+        """Первые ``limit`` произведений, название которых начинается
+        с ``prefix``, по алфавиту."""
+        self.ensure_built()
+        prefix = normalize(prefix)
+        with self.lock:
+            start = bisect_left(self.keys, (prefix,))
+            end = bisect_left(self.keys, (prefix + MAX_CHAR,), start)
+            return [
+                {'id': pk, 'name': self.names[pk]}
+                for _, pk in self.keys[start:min(end, start + limit)]
+            ]
+
+
+title_index = TitlePrefixIndex()
@@ -0,0 +1,207 @@
+from collections import defaultdict
+
+from reviews.models import Category, Genre, GenreTitle, Title
+from .indexes import InMemoryIndex
+
+# Параметры TitleFilter, на которые индекс умеет отвечать.
+BITMAP_FILTERS = frozenset(
+    ('genre', 'genre_mode', 'category', 'year', 'year_min', 'year_max')
+)
+REFRESH_BATCH_SIZE = 500
+
+
+def make_bitmap(ids):
+    """Битовая карта из id: бит с номером id равен 1."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        data[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(data, 'little')
+
+
+def count_bits(bitmap):
+    return bin(bitmap).count('1')
+
+
+def iter_bits(bitmap):
+    """id установленных битов по возрастанию."""
+    bits = bin(bitmap)[:1:-1]
+    index = bits.find('1')
+    while index != -1:
+        yield index
+        index = bits.find('1', index + 1)
+
+
+def split_values(value):
+    return [item for item in value.split(',') if item]
+
+
+class TitleBitmapIndex(InMemoryIndex):
+    """Битовые карты id произведений по жанрам, категориям и годам.
+
+    Карты - целые числа Python: пересечение и объединение выполняются
+    побитовыми операциями над всем множеством сразу. Устаревший индекс
+    не отвечает (``match`` возвращает None), и фильтр идёт через SQL.
+    """
+    models = (Title, GenreTitle, Category, Genre)
+    rebuild_interval_setting = 'TITLE_BITMAP_REBUILD_INTERVAL'
+
+    def empty_state(self):
+        return {'titles': {}, 'all_titles': 0, 'genres': {},
+                'categories': {}, 'years': {}, 'genre_slugs': {},
+                'category_slugs': {}}
+
+    def load_slugs(self):
+        return {
+            'genre_slugs': dict(Genre.objects.values_list('slug', 'pk')),
+            'category_slugs': dict(
+                Category.objects.values_list('slug', 'pk')
+            ),
+        }
+
+    def load(self):
+        titles = {
+            pk: (category_id, year, set())
+            for pk, category_id, year in Title.objects.values_list(
+                'pk', 'category_id', 'year'
+            ).iterator()
+        }
+        for title_id, genre_id in GenreTitle.objects.filter(
+            title__isnull=False, genre__isnull=False
+        ).values_list('title_id', 'genre_id').iterator():
+            if title_id in titles:
+                titles[title_id][2].add(genre_id)
+        genres, categories, years = (defaultdict(list) for _ in range(3))
+        for pk, (category_id, year, genre_ids) in titles.items():
+            categories[category_id].append(pk)
+            years[year].append(pk)
+            for genre_id in genre_ids:
+                genres[genre_id].append(pk)
+        return {
+            'titles': titles,
+            'all_titles': make_bitmap(titles),
+            'genres': {key: make_bitmap(ids) for key, ids in genres.items()},
+            'categories': {
+                key: make_bitmap(ids) for key, ids in categories.items()
+            },
+            'years': {key: make_bitmap(ids) for key, ids in years.items()},
+            **self.load_slugs(),
+        }
+
+    @staticmethod
+    def toggle(bitmaps, key, pk):
+        bitmaps[key] = bitmaps.get(key, 0) ^ (1 << pk)
+
+    def discard(self, pk):
+        if pk not in self.titles:
+            return
+        category_id, year, genre_ids = self.titles.pop(pk)
+        self.all_titles ^= 1 << pk
+        self.toggle(self.categories, category_id, pk)
+        self.toggle(self.years, year, pk)
+        for genre_id in genre_ids:
+            self.toggle(self.genres, genre_id, pk)
+
+    def add(self, pk, category_id, year, genre_ids):
+        self.titles[pk] = (category_id, year, genre_ids)
+        self.all_titles |= 1 << pk
+        self.toggle(self.categories, category_id, pk)
+        self.toggle(self.years, year, pk)
+        for genre_id in genre_ids:
+            self.toggle(self.genres, genre_id, pk)
+
+    def refresh(self, title_ids):
+        """Перечитывает из БД произведения и их жанры по id: удалённые
+        пропадают из карт, остальные переносятся в актуальные."""
+        if not self.can_update():
+            return
+        title_ids = sorted({pk for pk in title_ids if pk is not None})
+        for start in range(0, len(title_ids), REFRESH_BATCH_SIZE):
+            batch = title_ids[start:start + REFRESH_BATCH_SIZE]
+            rows = Title.objects.filter(pk__in=batch).values_list(
+                'pk', 'category_id', 'year'
+            )
+            genres = defaultdict(set)
+            for title_id, genre_id in GenreTitle.objects.filter(
+                title_id__in=batch, genre__isnull=False
+            ).values_list('title_id', 'genre_id'):
+                genres[title_id].add(genre_id)
+            with self.lock:
+                for pk in batch:
+                    self.discard(pk)
+                for pk, category_id, year in rows:
+                    self.add(pk, category_id, year, genres[pk])
+        self.mark_synced()
+
+    def refresh_slugs(self):
+        if not self.can_update():
+            return
+        slugs = self.load_slugs()
+        with self.lock:
+            self.__dict__.update(slugs)
+        self.mark_synced()
+
+    def union(self, bitmaps, keys):
+        result = 0
+        for key in keys:
+            result |= bitmaps.get(key, 0)
+        return result
+
+    def match_genres(self, slugs, mode):
+        genre_ids = [self.genre_slugs.get(slug) for slug in set(slugs)]
+        if mode != 'all':
+            return self.union(self.genres, genre_ids)
+        result = None
+        for genre_id in genre_ids:
+            bitmap = self.genres.get(genre_id, 0)
+            result = bitmap if result is None else result & bitmap
+        return result
+
+    def match_years(self, params):
+        if 'year' in params:
+            return self.years.get(int(params['year']), 0)
+        low = int(params.get('year_min', min(self.years, default=0)))
+        high = int(params.get('year_max', max(self.years, default=0)))
+        return self.union(
+            self.years, (year for year in self.years if low <= year <= high)
+        )
+
+    def match(self, params):
+        """Битовая карта произведений по параметрам фильтра или None,
+        если индекс устарел или параметры ему не подходят."""
+        params = {key: value for key, value in params.items() if value}
+        if not set(params) <= BITMAP_FILTERS:
+            return None
+        if params.get('genre_mode', 'any') not in ('any', 'all'):
+            return None
+        self.ensure_built()
+        if self.is_stale():
+            return None
+        with self.lock:
+            parts = []
+            if split_values(params.get('genre', '')):
+                parts.append(self.match_genres(
+                    split_values(params['genre']), params.get('genre_mode')
+                ))
+            if split_values(params.get('category', '')):
+                # Ключ None в categories - произведения без категории,
+                # неизвестный slug не должен на него попадать.
+                parts.append(self.union(self.categories, (
+                    self.category_slugs[slug]
+                    for slug in split_values(params['category'])
+                    if slug in self.category_slugs
+                )))
+            if params.keys() & {'year', 'year_min', 'year_max'}:
+                try:
+                    parts.append(self.match_years(params))
+                except ValueError:
+                    return None
+            result = self.all_titles
+            for part in parts:
+                result &= part
+            return result
+
+
+title_bitmaps = TitleBitmapIndex()
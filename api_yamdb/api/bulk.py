@@ -0,0 +1,181 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from reviews.models import Category, Genre, GenreTitle, Title
+from reviews.signals import titles_bulk_saved
+from .serializers import TitleCreateOrUpdateSerializer
+
+
+def prefetch_slugs(items):
+    """Жанры и категории всей пачки: по одному запросу на модель."""
+    genre_slugs, category_slugs = set(), set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if isinstance(item.get('genre'), list):
+            genre_slugs.update(str(slug) for slug in item['genre'])
+        if item.get('category') is not None:
+            category_slugs.add(str(item['category']))
+    return {
+        Genre: Genre.objects.in_bulk(genre_slugs, field_name='slug'),
+        Category: Category.objects.in_bulk(category_slugs,
+                                           field_name='slug'),
+    }
+
+
+def reserve_title_ids(count):
+    """Первый из ``count`` свободных id произведений в SQLite.
+
+    Пустое обновление берёт блокировку записи до чтения, поэтому
+    параллельная транзакция не получит те же id. Учитывается и
+    sqlite_sequence: id удалённых произведений не переиспользуются.
+    """
+    table = Title._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {table} SET id = id WHERE 0')
+        cursor.execute(
+            f'SELECT MAX(last) FROM (SELECT MAX(id) AS last FROM {table} '
+            'UNION ALL SELECT seq FROM sqlite_sequence WHERE name = %s)',
+            (table,)
+        )
+        return (cursor.fetchone()[0] or 0) + 1
+
+
+def save_titles(titles):
+    """Вставляет произведения пачкой и заполняет их первичные ключи.
+
+    Вызывается внутри транзакции. Кэш и индексы обновляет
+    ``titles_bulk_saved``; построчные post_save остаются только у БД
+    без RETURNING, кроме SQLite.
+    """
+    if not titles:
+        return
+    if connection.features.can_return_rows_from_bulk_insert:
+        Title.objects.bulk_create(titles)
+    elif connection.vendor == 'sqlite':
+        # Без RETURNING (SQLite в Django 3.2) bulk_create не заполняет
+        # первичные ключи, а они нужны для связей с жанрами: назначаем
+        # их сами, запись в SQLite всё равно идёт по одной транзакции.
+        first_id = reserve_title_ids(len(titles))
+        for pk, title in enumerate(titles, first_id):
+            title.pk = pk
+        Title.objects.bulk_create(titles)
+    else:
+        for title in titles:
+            title.save()
+
+
+def bulk_create_titles(items, context):
+    """Создаёт корректные произведения пачки в одной транзакции.
+
+    Возвращает список той же длины: ``{'id': ...}`` для созданных и
+    ``{'errors': ...}`` для отклонённых элементов.
+    """
+    context = {**context, 'slug_objects': prefetch_slugs(items)}
+    results = [None] * len(items)
+    created = []
+    for index, item in enumerate(items):
+        serializer = TitleCreateOrUpdateSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            results[index] = {'errors': serializer.errors}
+            continue
+        data = dict(serializer.validated_data)
+        genres = data.pop('genre')
+        created.append((index, Title(**data), genres))
+    with transaction.atomic():
+        save_titles([title for _, title, _ in created])
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genre)
+            for _, title, genres in created for genre in genres
+        )
+        titles_bulk_saved.send(sender=Title,
+                               titles=[title for _, title, _ in created],
+                               created=True)
+    for index, title, _ in created:
+        results[index] = {'id': title.pk}
+    return results
+
+
+def get_title_ids(items):
+    ids = []
+    for item in items:
+        try:
+            ids.append(int(item['id']))
+        except (KeyError, TypeError, ValueError):
+            ids.append(None)
+    return ids
+
+
+def bulk_update_titles(items, context):
+    """Частично обновляет произведения пачки в одной транзакции.
+
+    Каждый элемент должен содержать ``id``. Жанры меняются разницей:
+    удаляются и добавляются только изменившиеся связи.
+    """
+    context = {**context, 'slug_objects': prefetch_slugs(items)}
+    ids = get_title_ids(items)
+    instances = Title.objects.in_bulk([pk for pk in ids if pk is not None])
+    results = [None] * len(items)
+    updated, new_genres, fields, seen = [], {}, set(), set()
+    for index, (item, pk) in enumerate(zip(items, ids)):
+        if pk is None:
+            results[index] = {'errors': {'id': ['Обязательное поле.']}}
+            continue
+        if pk not in instances:
+            results[index] = {'errors': {'id': ['Произведение не найдено.']}}
+            continue
+        if pk in seen:
+            results[index] = {
+                'errors': {'id': ['Произведение уже есть в этой пачке.']}
+            }
+            continue
+        seen.add(pk)
+        title = instances[pk]
+        serializer = TitleCreateOrUpdateSerializer(
+            title, data=item, partial=True, context=context
+        )
+        if not serializer.is_valid():
+            results[index] = {'errors': serializer.errors}
+            continue
+        data = dict(serializer.validated_data)
+        if 'genre' in data:
+            new_genres[pk] = {genre.pk for genre in data.pop('genre')}
+        for field_name, value in data.items():
+            setattr(title, field_name, value)
+        fields.update(data)
+        updated.append(title)
+        results[index] = {'id': pk}
+    with transaction.atomic():
+        if fields:
+            Title.objects.bulk_update(updated, fields)
+        update_genre_links(new_genres)
+        titles_bulk_saved.send(sender=Title, titles=updated, created=False)
+    return results
+
+
+def update_genre_links(new_genres):
+    """Приводит связи произведений с жанрами к ``{title_id: {genre_id}}``
+    одним удалением и одной вставкой."""
+    if not new_genres:
+        return
+    current = defaultdict(set)
+    for title_id, genre_id in GenreTitle.objects.filter(
+        title_id__in=new_genres
+    ).values_list('title_id', 'genre_id'):
+        current[title_id].add(genre_id)
+    removed = [
+        Q(title_id=title_id, genre_id__in=current[title_id] - genres)
+        for title_id, genres in new_genres.items()
+        if current[title_id] - genres
+    ]
+    if removed:
+        GenreTitle.objects.filter(reduce(or_, removed)).delete()
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title_id=title_id, genre_id=genre_id)
+        for title_id, genres in new_genres.items()
+        for genre_id in genres - current[title_id]
+    )
@@ -0,0 +1,187 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+
+GENERATION_KEY = 'generation:{}'
+TITLE_KEY = 'title:{}'
+MODIFIED_KEY = 'modified:{}'
+LOCK_KEY = '{}:lock'
+STATS_KEY = 'stats:{}:{}'
+STATS_NAMES = ('categories', 'genres', 'titles', 'facets')
+STATS_EVENTS = ('hits', 'misses', 'stale', 'coalesced')
+OWN_GENERATIONS_LIMIT = 10000
+
+# Поколения, которые выдал bump_generation этого процесса.
+own_generations = defaultdict(set)
+own_generations_lock = threading.Lock()
+
+
+def generation_key(model):
+    return GENERATION_KEY.format(model._meta.label_lower)
+
+
+def modified_key(model):
+    return MODIFIED_KEY.format(model._meta.label_lower)
+
+
+def get_generations(models):
+    """Текущие поколения моделей: меняются при каждой записи в модель."""
+    keys = [generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return tuple(generations[key] for key in keys)
+
+
+def get_last_modified(models):
+    """Время последней записи в любую из моделей (timestamp)."""
+    keys = [modified_key(model) for model in models]
+    modified = cache.get_many(keys)
+    for key in keys:
+        if key not in modified:
+            cache.add(key, time.time(), None)
+            modified[key] = cache.get(key)
+    return max(modified.values())
+
+
+def increment_generation(model):
+    key = generation_key(model)
+    try:
+        generation = cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    else:
+        with own_generations_lock:
+            own = own_generations[key]
+            own.add(generation)
+            if len(own) > OWN_GENERATIONS_LIMIT:
+                # Самые старые значения больше не нужны индексам: без
+                # них индекс просто перестроится.
+                for old in sorted(own)[:len(own) // 2]:
+                    own.discard(old)
+    cache.set(modified_key(model), time.time(), None)
+
+
+def bump_generation(model):
+    """Меняет поколение модели сразу и ещё раз после коммита: запрос,
+    прочитавший данные до коммита, не сохранит их и не выдаст ETag
+    под поколением, которое останется после коммита."""
+    increment_generation(model)
+    transaction.on_commit(lambda: increment_generation(model))
+
+
+def is_own_change(models, old, new):
+    """Перешли ли поколения моделей от ``old`` к ``new`` только
+    записями этого процесса (тогда индексы процесса их уже учли)."""
+    with own_generations_lock:
+        for model, before, after in zip(models, old, new):
+            own = own_generations.get(generation_key(model), ())
+            if not 0 <= after - before <= len(own) or any(
+                generation not in own
+                for generation in range(before + 1, after + 1)
+            ):
+                return False
+    return True
+
+
+def make_key(prefix, *parts):
+    """Ключ кэша из префикса и хэша произвольных частей."""
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+def record_stat(name, event):
+    """Увеличивает счётчик попаданий (hits) или промахов (misses)."""
+    key = STATS_KEY.format(name, event)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_stats():
+    keys = {
+        STATS_KEY.format(name, event): (name, event)
+        for name in STATS_NAMES for event in STATS_EVENTS
+    }
+    values = cache.get_many(keys)
+    stats = {name: dict.fromkeys(STATS_EVENTS, 0) for name in STATS_NAMES}
+    for key, (name, event) in keys.items():
+        stats[name][event] = values.get(key, 0)
+    return stats
+
+
+def get_title_cache():
+    """Кэш готовых JSON-ответов произведений (алиас из настроек)."""
+    return caches[settings.TITLE_DETAIL_CACHE]
+
+
+def title_key(title_id):
+    return TITLE_KEY.format(title_id)
+
+
+def invalidate_titles(title_ids):
+    """Удаляет ответы произведений сразу и ещё раз после коммита, чтобы
+    не осталось ответа, собранного параллельным запросом по данным
+    до коммита."""
+    keys = [title_key(title_id) for title_id in set(title_ids) if title_id]
+    if not keys:
+        return
+    title_cache = get_title_cache()
+    title_cache.delete_many(keys)
+    transaction.on_commit(lambda: title_cache.delete_many(keys))
+
+
+def wait_for_entry(response_cache, key):
+    """Ждёт, пока значение посчитает другой запрос; None по таймауту."""
+    deadline = time.time() + settings.SINGLE_FLIGHT_WAIT
+    while time.time() < deadline:
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        entry = response_cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_compute(response_cache, key, compute, name):
+    """Значение из кэша с single-flight и stale-while-revalidate.
+
+    Записи хранятся как ``(свежо_до, значение)`` с временем жизни
+    ``fresh + stale`` из ``RESPONSE_CACHE_TTL[name]``. Пересчитывает
+    ключ только запрос, взявший блокировку: при устаревшей записи
+    остальные сразу получают старое значение, при отсутствии записи -
+    ждут результата не дольше ``SINGLE_FLIGHT_WAIT`` секунд.
+    """
+    ttl = settings.RESPONSE_CACHE_TTL[name]
+    lock_key = LOCK_KEY.format(key)
+    entry = response_cache.get(key)
+    if entry is not None and time.time() < entry[0]:
+        record_stat(name, 'hits')
+        return entry[1]
+    locked = response_cache.add(lock_key, 1,
+                                settings.SINGLE_FLIGHT_LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            record_stat(name, 'stale')
+            return entry[1]
+        entry = wait_for_entry(response_cache, key)
+        if entry is not None:
+            record_stat(name, 'coalesced')
+            return entry[1]
+    record_stat(name, 'misses')
+    try:
+        value = compute()
+        response_cache.set(key, (time.time() + ttl['fresh'], value),
+                           ttl['fresh'] + ttl['stale'])
+    finally:
+        if locked:
+            response_cache.delete(lock_key)
+    return value
@@ -0,0 +1,161 @@
+import csv
+import json
+import zlib
+from collections import defaultdict
+
+from datetime import datetime, time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from reviews.models import Comment, GenreTitle, Review, Title
+
+TITLE_FIELDS = ('id', 'name', 'year', 'description', 'category', 'genre',
+                'rating')
+REVIEW_COLUMNS = {
+    'id': 'pk',
+    'title_id': 'title_id',
+    'title': 'title__name',
+    'author': 'author__username',
+    'text': 'text',
+    'score': 'score',
+    'pub_date': 'pub_date',
+}
+COMMENT_COLUMNS = {
+    'id': 'pk',
+    'review_id': 'review_id',
+    'title_id': 'review__title_id',
+    'title': 'review__title__name',
+    'author': 'author__username',
+    'text': 'text',
+    'pub_date': 'pub_date',
+}
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def iter_chunks(queryset, chunk_size=None):
+    """Обходит queryset.values() пачками по возрастанию первичного ключа.
+
+    Каждая пачка - отдельный запрос с ``pk > последний``, без OFFSET,
+    поэтому в памяти держится только одна пачка.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    last_pk = None
+    while True:
+        chunk = queryset.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]['pk']
+
+
+def iter_titles(chunk_size=None):
+    """Произведения с категорией, жанрами и рейтингом: два запроса
+    на пачку."""
+    queryset = Title.objects.values(
+        'pk', 'name', 'year', 'description', 'category__slug', 'rating'
+    )
+    for chunk in iter_chunks(queryset, chunk_size):
+        genres = defaultdict(list)
+        for title_id, slug in GenreTitle.objects.filter(
+            title_id__in=[row['pk'] for row in chunk],
+            genre__isnull=False
+        ).order_by('genre__name').values_list('title_id', 'genre__slug'):
+            genres[title_id].append(slug)
+        for row in chunk:
+            yield {
+                'id': row['pk'],
+                'name': row['name'],
+                'year': row['year'],
+                'description': row['description'],
+                'category': row['category__slug'],
+                'genre': genres[row['pk']],
+                'rating': row['rating'],
+            }
+
+
+def parse_since(value):
+    """Дата или дата со временем из ?since=; None, если не разобрать."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def iter_joined(queryset, columns, since=None, chunk_size=None):
+    """Строки с уже соединёнными в SQL связями: один запрос на пачку."""
+    if since is not None:
+        queryset = queryset.filter(pub_date__gte=since)
+    for chunk in iter_chunks(queryset.values(*columns.values()), chunk_size):
+        for row in chunk:
+            row['pub_date'] = row['pub_date'].isoformat()
+            yield {name: row[lookup] for name, lookup in columns.items()}
+
+
+def iter_reviews(since=None, chunk_size=None):
+    return iter_joined(Review.objects.all(), REVIEW_COLUMNS, since,
+                       chunk_size)
+
+
+def iter_comments(since=None, chunk_size=None):
+    return iter_joined(Comment.objects.all(), COMMENT_COLUMNS, since,
+                       chunk_size)
+
+
+DATASETS = {
+    'reviews': iter_reviews,
+    'comments': iter_comments,
+}
+
+
+def gzip_stream(lines):
+    """Сжимает поток строк в gzip по мере генерации."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for line in lines:
+        data = compressor.compress(line.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+
+
+def render_csv(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(
+            ','.join(value) if isinstance(value, list) else value
+            for value in (row[field] for field in fields)
+        )
+
+
+def render(rows, export_format, fields):
+    if export_format == 'csv':
+        return render_csv(rows, fields)
+    return render_ndjson(rows)
@@ -0,0 +1,48 @@
+from django.db.models import Count
+
+from reviews.models import GenreTitle
+
+
+def count_genres(queryset):
+    return [
+        {'slug': row['genre__slug'], 'name': row['genre__name'],
+         'count': row['count']}
+        for row in GenreTitle.objects.filter(
+            title__in=queryset.order_by().values('pk'),
+            genre__isnull=False
+        ).values('genre__slug', 'genre__name').annotate(
+            count=Count('pk')
+        ).order_by('-count', 'genre__name')
+    ]
+
+
+def count_categories(queryset):
+    return [
+        {'slug': row['category__slug'], 'name': row['category__name'],
+         'count': row['count']}
+        for row in queryset.filter(category__isnull=False).values(
+            'category__slug', 'category__name'
+        ).annotate(count=Count('pk')).order_by('-count', 'category__name')
+    ]
+
+
+def count_years(queryset):
+    return [
+        {'value': row['year'], 'count': row['count']}
+        for row in queryset.values('year').annotate(
+            count=Count('pk')
+        ).order_by('year')
+    ]
+
+
+FACETS = {
+    'genre': count_genres,
+    'category': count_categories,
+    'year': count_years,
+}
+
+
+def get_facets(queryset, names):
+    """Количество произведений queryset по значениям фасетов: один
+    запрос с GROUP BY на фасет."""
+    return {name: FACETS[name](queryset) for name in names}
@@ -0,0 +1,58 @@
+from rest_framework import serializers
+
+
+class PrefetchedSlugsMixin:
+    """Поиск объектов по слагам в словаре ``context['slug_objects']``.
+
+    Словарь вида ``{модель: {слаг: объект}}`` заполняется заранее одним
+    запросом на всю пачку данных, например при массовом создании.
+    """
+
+    def get_prefetched(self):
+        return self.context.get('slug_objects', {}).get(self.queryset.model)
+
+
+class PrefetchedSlugRelatedField(PrefetchedSlugsMixin,
+                                 serializers.SlugRelatedField):
+    """SlugRelatedField, который сначала ищет объект среди загруженных."""
+
+    def to_internal_value(self, data):
+        objects = self.get_prefetched()
+        if objects is None:
+            return super().to_internal_value(data)
+        if str(data) not in objects:
+            self.fail('does_not_exist', slug_name=self.slug_field,
+                      value=str(data))
+        return objects[str(data)]
+
+
+class SlugListRelatedField(PrefetchedSlugsMixin, serializers.ListField):
+    """Список объектов по слагам, найденных одним запросом."""
+    child = serializers.SlugField()
+    default_error_messages = {
+        'does_not_exist': 'Object with {slug_name}={value} does not exist.',
+    }
+
+    def __init__(self, queryset, slug_field='slug', **kwargs):
+        self.queryset = queryset
+        self.slug_field = slug_field
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        slugs = list(dict.fromkeys(super().to_internal_value(data)))
+        objects = self.get_prefetched()
+        if objects is None:
+            objects = {
+                getattr(obj, self.slug_field): obj
+                for obj in self.queryset.filter(
+                    **{f'{self.slug_field}__in': slugs}
+                )
+            }
+        for slug in slugs:
+            if slug not in objects:
+                self.fail('does_not_exist', slug_name=self.slug_field,
+                          value=slug)
+        return [objects[slug] for slug in slugs]
+
+    def to_representation(self, value):
+        return [getattr(obj, self.slug_field) for obj in value.all()]
@@ -1,12 +1,93 @@
-from django_filters import FilterSet, CharFilter
+from functools import reduce
+from operator import or_
 
-from reviews.models import Title
+from django.db.models import Count, Q
+from django_filters import (BaseInFilter, CharFilter, ChoiceFilter, FilterSet,
+                            NumberFilter, OrderingFilter)
+from rest_framework.filters import SearchFilter
+
+from reviews.models import Category, GenreTitle, Title
+from .normalization import normalize
+from reviews.search import get_search_backend
+
+
+class CharInFilter(BaseInFilter, CharFilter):
+    """Список значений через запятую."""
 
 
 class TitleFilter(FilterSet):
-    category = CharFilter(field_name='category__slug')
-    genre = CharFilter(field_name='genre__slug')
+    category = CharInFilter(method='filter_category')
+    genre = CharInFilter(method='filter_genre')
+    genre_mode = ChoiceFilter(
+        choices=(('any', 'any'), ('all', 'all')),
+        method='filter_genre_mode'
+    )
+    year_min = NumberFilter(field_name='year', lookup_expr='gte')
+    year_max = NumberFilter(field_name='year', lookup_expr='lte')
+    rating_min = NumberFilter(field_name='rating', lookup_expr='gte')
+    rating_max = NumberFilter(field_name='rating', lookup_expr='lte')
+    search = CharFilter(method='filter_search')
+    ordering = OrderingFilter(
+        fields=(
+            ('rating', 'rating'),
+            ('year', 'year'),
+            ('rating_count', 'review_count'),
+        )
+    )
 
     class Meta:
         model = Title
         fields = ('name', 'year', 'category', 'genre')
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(category_id__in=Category.objects.filter(
+            slug__in=value
+        ).values('pk'))
+
+    def filter_genre(self, queryset, name, value):
+        """Произведения с любым (genre_mode=any) или со всеми
+        (genre_mode=all) жанрами из списка.
+
+        Вместо JOIN + DISTINCT условие - подзапрос ``pk IN`` по
+        GenreTitle, для режима all - с группировкой по произведению,
+        поэтому произведение не повторяется в выдаче.
+        """
+        slugs = list(dict.fromkeys(value))
+        links = GenreTitle.objects.filter(genre__slug__in=slugs)
+        if self.form.cleaned_data.get('genre_mode') == 'all':
+            links = links.values('title_id').annotate(
+                matched=Count('genre_id')
+            ).filter(matched=len(slugs))
+        return queryset.filter(pk__in=links.values('title_id'))
+
+    def filter_genre_mode(self, queryset, name, value):
+        # Учитывается в filter_genre.
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию, по умолчанию
+        упорядоченный по релевантности."""
+        return get_search_backend().search(queryset, value)
+
+
+class NormalizedSearchFilter(SearchFilter):
+    """SearchFilter по нормализованным теневым колонкам.
+
+    ``search_fields`` вьюсета перечисляют теневые колонки, слова запроса
+    нормализуются так же, поэтому сравнение не зависит от регистра и
+    «ё»/«е» на любой БД. Ищется вхождение слова, как в SearchFilter.
+    """
+
+    def get_search_terms(self, request):
+        return [normalize(term) for term in super().get_search_terms(request)]
+
+    def filter_queryset(self, request, queryset, view):
+        fields = getattr(view, 'search_fields', None)
+        terms = self.get_search_terms(request)
+        if not fields or not terms:
+            return queryset
+        for term in terms:
+            queryset = queryset.filter(reduce(
+                or_, (Q(**{f'{field}__contains': term}) for field in fields)
+            ))
+        return queryset
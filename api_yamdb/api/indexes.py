@@ -0,0 +1,112 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import get_generations, is_own_change
+
+
+class InMemoryIndex(ABC):
+    """Индекс в памяти процесса, построенный по данным из БД.
+
+    Строится при первом обращении. Записи этого процесса подклассы
+    вносят сами по сигналам и вызывают ``mark_synced``. Записи других
+    процессов видны по поколениям ``models`` в кэше, которые выдал не
+    этот процесс: такой индекс считается устаревшим и перестраивается
+    не чаще раза в ``settings.<rebuild_interval_setting>`` секунд.
+    """
+    models = ()
+    rebuild_interval_setting = None
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.build_lock = threading.Lock()
+        self.building = False
+        self.changed_during_build = False
+        self.reset()
+
+    @abstractmethod
+    def empty_state(self):
+        """Атрибуты пустого индекса."""
+
+    @abstractmethod
+    def load(self):
+        """Атрибуты индекса, прочитанные из БД."""
+
+    def reset(self):
+        with self.lock:
+            self.__dict__.update(self.empty_state())
+            self.generation = None
+            self.built_at = None
+
+    def build(self):
+        self.building, self.changed_during_build = True, False
+        try:
+            generation = get_generations(self.models)
+            # Все таблицы читаются в одной транзакции, то есть из одного
+            # снимка данных.
+            with transaction.atomic():
+                state = self.load()
+            with self.lock:
+                self.__dict__.update(state)
+                # Запись, внесённая во время сборки, могла попасть в
+                # старое состояние, а не в прочитанное.
+                self.generation = (
+                    None if self.changed_during_build else generation
+                )
+                self.built_at = time.monotonic()
+        finally:
+            self.building = False
+
+    @property
+    def is_built(self):
+        return self.built_at is not None
+
+    def is_stale(self):
+        return (not self.is_built or self.generation is None
+                or not is_own_change(self.models, self.generation,
+                                     get_generations(self.models)))
+
+    def needs_build(self):
+        return not self.is_built or (
+            self.is_stale()
+            and time.monotonic() - self.built_at
+            >= getattr(settings, self.rebuild_interval_setting)
+        )
+
+    def ensure_built(self):
+        """Строит индекс в одном потоке: первую сборку остальные ждут,
+        при перестроении отвечают по текущему состоянию."""
+        if not self.needs_build():
+            return
+        if not self.build_lock.acquire(blocking=not self.is_built):
+            return
+        try:
+            if self.needs_build():
+                self.build()
+        finally:
+            self.build_lock.release()
+
+    def can_update(self):
+        """Можно ли внести запись в индекс точечно."""
+        if self.building:
+            self.changed_during_build = True
+        return self.is_built
+
+    def mark_synced(self):
+        """Принимает текущие поколения после внесения своих записей, если
+        с прошлой синхронизации модели меняли только записи этого
+        процесса; иначе индекс остаётся устаревшим до перестроения."""
+        generation = get_generations(self.models)
+        if self.generation is not None and is_own_change(
+            self.models, self.generation, generation
+        ):
+            self.generation = generation
+
+    def invalidate(self):
+        """Помечает индекс устаревшим, если изменения не внести
+        точечно."""
+        self.changed_during_build = True
+        self.generation = None
@@ -1,4 +1,18 @@
-from rest_framework import mixins, viewsets
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import mixins, status, viewsets
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from reviews.models import Review, Title
+from .bitmaps import count_bits, iter_bits, title_bitmaps
+from .facets import FACETS, get_facets
+from .cache import (get_generations, get_last_modified, get_or_compute,
+                    get_title_cache, make_key, title_key)
 
 
 class ListCreateDeleteViewSet(mixins.CreateModelMixin,
@@ -6,3 +20,206 @@ class ListCreateDeleteViewSet(mixins.CreateModelMixin,
                               mixins.ListModelMixin,
                               viewsets.GenericViewSet):
     pass
+
+
+class TitleNestedMixin:
+    """Произведение из URL вложенного маршрута, загружается один раз
+    за запрос."""
+
+    def get_title(self):
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title, pk=self.kwargs.get('title_id')
+            )
+        return self._title
+
+
+class ReviewNestedMixin(TitleNestedMixin):
+    """Отзыв из URL вложенного маршрута, загружается один раз за запрос
+    и только если относится к произведению из того же URL."""
+
+    def get_review(self):
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                pk=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id')
+            )
+        return self._review
+
+
+class CacheModelsMixin:
+    """Модели, от которых зависит ответ: по их поколениям строятся ключи
+    кэша и ETag. По умолчанию - модель queryset."""
+    cache_models = ()
+
+    def get_cache_models(self):
+        return self.cache_models or (self.get_queryset().model,)
+
+
+class ConditionalGetMixin(CacheModelsMixin):
+    """ETag и Last-Modified по поколениям моделей из ``cache_models``.
+    На совпавший If-None-Match (If-Modified-Since) отвечает 304
+    до обращения к queryset."""
+
+    def get_etag(self, request):
+        key = make_key('etag', request.get_full_path(),
+                       request.accepted_renderer.format,
+                       get_generations(self.get_cache_models()))
+        return '"{}"'.format(key.split(':')[1])
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        last_modified = int(get_last_modified(self.get_cache_models()))
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class CachedListMixin(CacheModelsMixin):
+    """Кэширует данные ответа list по полному адресу запроса (вместе с
+    ?search= и страницей). Запись в модели из ``cache_models`` меняет
+    их поколение, и старые записи кэша больше не читаются."""
+    cache_name = None
+
+    def list(self, request, *args, **kwargs):
+        key = make_key('list', request.build_absolute_uri(),
+                       get_generations(self.get_cache_models()))
+        return Response(get_or_compute(
+            cache, key,
+            lambda: super(CachedListMixin, self).list(
+                request, *args, **kwargs
+            ).data,
+            self.cache_name
+        ))
+
+
+class FacetsMixin(CacheModelsMixin):
+    """Добавляет к ответу list счётчики по значениям фасетов из
+    ``?facets=genre,category,year`` для отфильтрованного списка.
+
+    Счётчики кэшируются по параметрам фильтра ``filterset_class`` и
+    поколениям ``cache_models``, пагинация и сортировка на них не
+    влияют.
+    """
+    facets_query_param = 'facets'
+
+    def get_facet_names(self, request):
+        value = request.query_params.get(self.facets_query_param, '')
+        return list(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()
+        ))
+
+    def get_facets_key(self, request, names):
+        filters = self.filterset_class.base_filters
+        params = sorted(
+            (key, tuple(sorted(values)))
+            for key, values in request.query_params.lists()
+            if key in filters and key != 'ordering'
+        )
+        return make_key('facets', params, names,
+                        get_generations(self.get_cache_models()))
+
+    def list(self, request, *args, **kwargs):
+        names = self.get_facet_names(request)
+        unknown = [name for name in names if name not in FACETS]
+        if unknown:
+            return Response(
+                f'Неизвестные фасеты: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(FACETS)}',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response = super().list(request, *args, **kwargs)
+        if names and response.status_code == status.HTTP_200_OK:
+            model = self.filterset_class._meta.model
+            response.data['facets'] = get_or_compute(
+                cache, self.get_facets_key(request, names),
+                lambda: get_facets(
+                    self.filter_queryset(model.objects.all()), names
+                ),
+                'facets'
+            )
+        return response
+
+
+class BitmapFilterMixin:
+    """Отвечает на фильтры произведений по жанрам, категориям и годам
+    пересечением битовых карт ``title_bitmaps``.
+
+    Количество найденных берётся из карты (``filtered_count`` для
+    пагинации), а если их не больше ``TITLE_BITMAP_MAX_IDS``, то и
+    записи выбираются по id. С другими параметрами фильтра или при
+    устаревшем индексе фильтрует ``filterset_class`` через SQL.
+    """
+    filtered_count = None
+
+    def filter_queryset(self, queryset):
+        self.filtered_count = None
+        params = {
+            key: value for key, value in self.request.query_params.items()
+            if key in self.filterset_class.base_filters
+        }
+        ordering = params.pop('ordering', None)
+        bitmap = title_bitmaps.match(params) if params else None
+        if bitmap is None:
+            return super().filter_queryset(queryset)
+        count = count_bits(bitmap)
+        if count > settings.TITLE_BITMAP_MAX_IDS:
+            self.filtered_count = count
+            return super().filter_queryset(queryset)
+        filterset = self.filterset_class(
+            {'ordering': ordering} if ordering else {},
+            queryset=queryset.filter(pk__in=list(iter_bits(bitmap))),
+            request=self.request
+        )
+        if not filterset.is_valid():
+            return super().filter_queryset(queryset)
+        self.filtered_count = count
+        return filterset.qs
+
+
+class RenderedTitleCacheMixin:
+    """Отдаёт retrieve произведения готовыми байтами JSON из кэша.
+
+    Кэшируется только ответ без параметров запроса в формате JSON,
+    промахи по одному ключу пересчитывает один запрос.
+    Записи удаляются сигналами при изменении самого произведения,
+    его жанров, категории или отзывов.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+        # Ключ строится по числовому id, как и при удалении записей:
+        # /titles/01/ и /titles/1/ - один ответ.
+        try:
+            title_id = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+        key = title_key(title_id)
+        content = get_or_compute(
+            get_title_cache(), key,
+            lambda: JSONRenderer().render(super(
+                RenderedTitleCacheMixin, self
+            ).retrieve(request, *args, **kwargs).data),
+            'titles'
+        )
+        return HttpResponse(content, content_type='application/json')
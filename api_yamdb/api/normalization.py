@@ -0,0 +1,47 @@
+def normalize(value):
+    """Текст для поиска: casefold и «е» вместо «ё».
+
+    SQLite сравнивает без учёта регистра только латиницу, поэтому
+    поиск идёт по заранее нормализованным теневым колонкам.
+    """
+    return (value or '').casefold().replace('ё', 'е')
+
+
+class NormalizedFieldsMixin:
+    """Заполняет теневые колонки при сохранении модели.
+
+    ``normalized_fields`` - словарь ``{теневое поле: исходное поле}``.
+    Записи в обход save() (bulk_create, сырой SQL) нужно досчитать
+    командой ``normalize_search``.
+    """
+    normalized_fields = {}
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        for target, source in self.normalized_fields.items():
+            setattr(self, target, normalize(getattr(self, source)))
+            if update_fields is not None and source in update_fields:
+                update_fields = {*update_fields, target}
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+
+def normalize_existing(model, batch_size=1000):
+    """Пересчитывает теневые колонки всех записей модели, где они
+    расходятся с исходными полями. Возвращает число обновлённых."""
+    fields = model.normalized_fields
+    changed = []
+    for instance in model.objects.only(
+        'pk', *fields, *fields.values()
+    ).iterator(chunk_size=batch_size):
+        stale = False
+        for target, source in fields.items():
+            value = normalize(getattr(instance, source))
+            if getattr(instance, target) != value:
+                setattr(instance, target, value)
+                stale = True
+        if stale:
+            changed.append(instance)
+    model.objects.bulk_update(changed, fields, batch_size=batch_size)
+    return len(changed)
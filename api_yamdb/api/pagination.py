@@ -0,0 +1,293 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import get_generations, make_key
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, который берёт COUNT(*) из кэша по ключу или готовое
+    количество ``known_count``."""
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 known_count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.known_count = known_count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = super().count
+            cache.set(self.count_key, count,
+                      settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Постраничная пагинация с размером страницы от клиента.
+
+    Размер задаётся ``?page_size=`` (не больше ``max_page_size``).
+    С ``?count=false`` общее количество не считается: в ответе только
+    ``next``/``previous`` и ``results``. Иначе COUNT(*) кэшируется по
+    пути, параметрам фильтрации и поколениям моделей из
+    ``view.cache_models``, поэтому любая запись сбрасывает счётчик.
+    Если вьюсет уже знает количество (``view.filtered_count``), COUNT(*)
+    не выполняется.
+    """
+    django_paginator_class = CachedCountPaginator
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def is_count_requested(self, request):
+        return request.query_params.get(
+            self.count_query_param, ''
+        ).lower() not in ('false', '0')
+
+    def get_count_key(self, queryset, request, view):
+        models = getattr(view, 'cache_models', None) or (queryset.model,)
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+            if key not in (self.page_query_param,
+                           self.page_size_query_param,
+                           self.count_query_param)
+        )
+        return make_key('count', request.path, params,
+                        get_generations(models))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        self.with_count = self.is_count_requested(request)
+        if not self.with_count:
+            return self.paginate_without_count(queryset, request, page_size)
+        paginator = self.django_paginator_class(
+            queryset, page_size,
+            count_key=self.get_count_key(queryset, request, view),
+            known_count=getattr(view, 'filtered_count', None)
+        )
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        return list(self.page)
+
+    def paginate_without_count(self, queryset, request, page_size):
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+        except ValueError:
+            self.page_number = 0
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params.get(self.page_query_param),
+                message='Invalid page.'
+            ))
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(results) > page_size
+        return results[:page_size]
+
+    def get_next_link(self):
+        if self.with_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.page_query_param,
+                                   self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.with_count:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param,
+                                   self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.with_count:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count']['description'] = (
+            'Отсутствует при ?count=false'
+        )
+        return schema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'false - не считать общее количество записей',
+            'schema': {'type': 'boolean'},
+        }]
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Курсорная пагинация от новых записей к старым по ключу (pub_date, id).
+
+    CursorPagination из DRF сравнивает только первое поле сортировки, а
+    записи с одинаковым pub_date пропускает через OFFSET. Здесь позиция
+    курсора - пара pub_date и id, она уникальна, поэтому страница всегда
+    выбирается условием по индексу (..., pub_date, id) без OFFSET.
+    Размер страницы задаётся ``?page_size=``, как в постраничном режиме.
+    """
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = CachedCountPagination.page_size_query_param
+    max_page_size = CachedCountPagination.max_page_size
+    position_separator = '|'
+
+    def _get_position_from_instance(self, instance, ordering):
+        return (f'{instance.pub_date.isoformat()}'
+                f'{self.position_separator}{instance.pk}')
+
+    def parse_position(self, position):
+        pub_date, _, pk = position.rpartition(self.position_separator)
+        try:
+            pub_date, pk = parse_datetime(pub_date), int(pk)
+        except ValueError:
+            pub_date = None
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def filter_after(self, queryset, position, older):
+        """Записи строго после позиции: более старые при ``older``,
+        иначе более новые."""
+        pub_date, pk = self.parse_position(position)
+        if older:
+            return queryset.filter(
+                Q(pub_date__lte=pub_date) & ~Q(pub_date=pub_date, pk__gte=pk)
+            )
+        return queryset.filter(
+            Q(pub_date__gte=pub_date) & ~Q(pub_date=pub_date, pk__lte=pk)
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Повторяет CursorPagination.paginate_queryset, но фильтрует по
+        # составному ключу.
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+        if reverse:
+            queryset = queryset.order_by('pub_date', 'id')
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = self.filter_after(queryset, current_position,
+                                         older=not reverse)
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering)
+            if has_following_position else None
+        )
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class PageNumberOrCursorPagination(BasePagination):
+    """Постраничная пагинация по умолчанию или курсорная по запросу.
+
+    Курсорный режим включается параметром ``?pagination=cursor`` и
+    сохраняется в ссылках ``next``/``previous`` через параметр ``cursor``.
+    В нём нет ни OFFSET, ни COUNT(*).
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def __init__(self):
+        self.page_number_paginator = CachedCountPagination()
+        self.cursor_paginator = PubDateCursorPagination()
+        self.paginator = self.page_number_paginator
+
+    def is_cursor_mode(self, request):
+        return (
+            self.cursor_paginator.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param)
+            == self.cursor_mode
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_cursor_mode(request):
+            self.paginator = self.cursor_paginator
+        else:
+            self.paginator = self.page_number_paginator
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_paginator.get_paginated_response_schema(
+            schema
+        )
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_fields(self, view):
+        return (self.page_number_paginator.get_schema_fields(view)
+                + self.cursor_paginator.get_schema_fields(view))
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            self.page_number_paginator.get_schema_operation_parameters(view)
+            + self.cursor_paginator.get_schema_operation_parameters(view)
+        )
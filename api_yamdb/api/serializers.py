@@ -1,12 +1,40 @@
+from django.contrib.auth.tokens import default_token_generator
 from django.core.exceptions import ValidationError
-from django.db.models import Avg
-from django.shortcuts import get_object_or_404
-from rest_framework import serializers
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import permissions, serializers
 
-from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
-                            Title)
+from reviews.models import Category, Comment, Genre, Review, Title
 from users.models import User
-from .validators import validate_genre
+from .fields import PrefetchedSlugRelatedField, SlugListRelatedField
+from .validators import validate_genre, validate_username
+
+
+class SparseFieldsMixin:
+    """Выбор полей ответа на GET-запрос параметрами ?fields= и ?omit=."""
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        """Поля, которые нужно отдать клиенту: по ним вьюсет решает,
+        какие связи подгружать."""
+        requested = set(cls.Meta.fields)
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return requested
+        fields = request.query_params.get(cls.fields_query_param)
+        omit = request.query_params.get(cls.omit_query_param)
+        if fields:
+            requested &= set(fields.split(','))
+        if omit:
+            requested -= set(omit.split(','))
+        return requested
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.get_requested_fields(self.context.get('request'))
+        for field_name in set(self.fields) - requested:
+            self.fields.pop(field_name)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -34,9 +62,15 @@ class GetTokenSerializer(serializers.ModelSerializer):
 
 
 class SignupSerializer(serializers.ModelSerializer):
-    """Сериализатор регистрации пользователя."""
+    """Сериализатор регистрации пользователя.
+
+    Повторная регистрация с теми же username и email возвращает уже
+    созданного пользователя, новый пользователь с кодом подтверждения
+    записывается одним INSERT.
+    """
     username = serializers.CharField(max_length=150,
-                                     required=True)
+                                     required=True,
+                                     validators=[validate_username])
     email = serializers.EmailField(max_length=254,
                                    required=True)
 
@@ -44,19 +78,49 @@ class SignupSerializer(serializers.ModelSerializer):
         model = User
         fields = ('username', 'email')
 
+    @staticmethod
+    def get_registered_user(data):
+        """Пользователь с этими username и email или None; одним запросом
+        проверяет, что username и email не заняты разными пользователями."""
+        users = User.objects.filter(
+            Q(username=data['username']) | Q(email=data['email'])
+        ).order_by()[:2]
+        for user in users:
+            if user.username != data['username']:
+                raise ValidationError(
+                    "Другой пользователь с такой почтой уже существует")
+            if user.email != data['email']:
+                raise ValidationError("Вы ввели неверную почту")
+            return user
+        return None
+
     def validate(self, data):
         """Проверка корректности email и запрет на повторную регистрацию."""
-        username_check = User.objects.filter(
-            username=data.get('username')).exists()
-        email_check = User.objects.filter(
-            email=data.get('email')).exists()
-        if email_check and not username_check:
-            raise ValidationError(
-                "Другой пользователь с такой почтой уже существует")
-        if not email_check and username_check:
-            raise ValidationError("Вы ввели неверную почту")
+        self.registered_user = self.get_registered_user(data)
         return data
 
+    def create(self, validated_data):
+        user = self.registered_user
+        if user is not None:
+            if not user.confirmation_code:
+                user.confirmation_code = (
+                    default_token_generator.make_token(user)
+                )
+                user.save(update_fields=('confirmation_code',))
+            return user
+        try:
+            with transaction.atomic():
+                return User.objects.create(**validated_data)
+        except IntegrityError:
+            # Параллельный запрос успел зарегистрировать username или email.
+            try:
+                user = self.get_registered_user(validated_data)
+            except ValidationError as error:
+                raise serializers.ValidationError(error.messages)
+            if user is None:
+                raise
+            return user
+
 
 class CategorySerializer(serializers.ModelSerializer):
     """Сериализатор модели категорий."""
@@ -74,10 +138,10 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug',)
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор просмотра модели произведений."""
     genre = GenreSerializer(many=True)
-    rating = serializers.SerializerMethodField('get_rating')
+    rating = serializers.FloatField(read_only=True)
     category = CategorySerializer(read_only=True, many=False)
 
     class Meta:
@@ -85,39 +149,41 @@ class TitleSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'year', 'genre', 'category', 'description',
                   'rating')
 
-    def get_rating(self, obj):
-        obj = obj.reviews.all().aggregate(rating=Avg('score'))
-        return obj['rating']
-
 
 class TitleCreateOrUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор создания или редактирования модели произведений."""
-    genre = serializers.SlugRelatedField(many=True,
-                                         slug_field='slug',
-                                         queryset=Genre.objects.all())
-    rating = serializers.IntegerField(read_only=True)
-    category = serializers.SlugRelatedField(slug_field='slug',
-                                            queryset=Category.objects.all())
+    genre = SlugListRelatedField(slug_field='slug',
+                                 queryset=Genre.objects.all())
+    rating = serializers.FloatField(read_only=True)
+    category = PrefetchedSlugRelatedField(slug_field='slug',
+                                          queryset=Category.objects.all())
 
     class Meta:
         model = Title
         fields = ('id', 'name', 'year', 'genre', 'category', 'description',
                   'rating')
 
+    @transaction.atomic
     def create(self, validated_data):
         genres = validated_data.pop('genre')
         title = Title.objects.create(**validated_data)
-        for current_genre in genres:
-            GenreTitle.objects.create(
-                genre=current_genre, title=title
-            )
+        title.genre.add(*genres)
         return title
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genre', None)
+        instance = super().update(instance, validated_data)
+        if genres is not None:
+            # set() меняет только добавленные и удалённые связи.
+            instance.genre.set(genres)
+        return instance
+
     def validate_genre(selv, value):
         return validate_genre(value)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели отзывов."""
     author = serializers.SlugRelatedField(
         slug_field='username',
@@ -137,8 +203,7 @@ class ReviewSerializer(serializers.ModelSerializer):
     def validate(self, data):
         """Проверка повторного отзыва к текущему произведению."""
         request = self.context['request']
-        title_id = self.context.get('view').kwargs.get('title_id')
-        title = get_object_or_404(Title, pk=title_id)
+        title = self.context['view'].get_title()
         if (
                 request.method == 'POST'
                 and Review.objects.filter(title=title,
@@ -150,7 +215,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         return data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели комментариев к отзыву."""
     author = serializers.SlugRelatedField(slug_field='username',
                                           read_only=True)
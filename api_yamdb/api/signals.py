@@ -0,0 +1,145 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from reviews.signals import titles_bulk_saved
+from users.models import User
+from .authentication import forget_token_version, set_token_version
+from .autocomplete import title_index
+from .bitmaps import title_bitmaps
+from .cache import bump_generation, invalidate_titles
+
+TRACKED_MODELS = (Category, Genre, Title, GenreTitle, Review, Comment, User)
+
+
+def model_changed(sender, **kwargs):
+    bump_generation(sender)
+
+
+def genre_links_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_generation(GenreTitle)
+
+
+def update_title_index(titles, deleted=False):
+    rows = [(title.pk, title.name) for title in titles]
+    transaction.on_commit(lambda: title_index.update(rows, deleted))
+
+
+def refresh_bitmaps(title_ids):
+    title_ids = list(title_ids)
+    transaction.on_commit(lambda: title_bitmaps.refresh(title_ids))
+
+
+def titles_bulk_changed(sender, titles, **kwargs):
+    bump_generation(Title)
+    bump_generation(GenreTitle)
+    invalidate_titles(title.pk for title in titles)
+    update_title_index(titles)
+    refresh_bitmaps(title.pk for title in titles)
+
+
+for tracked_model in TRACKED_MODELS:
+    post_save.connect(model_changed, sender=tracked_model,
+                      dispatch_uid=f'{tracked_model._meta.label}_saved')
+    post_delete.connect(model_changed, sender=tracked_model,
+                        dispatch_uid=f'{tracked_model._meta.label}_deleted')
+m2m_changed.connect(genre_links_changed, sender=Title.genre.through,
+                    dispatch_uid='title_genre_changed')
+titles_bulk_saved.connect(titles_bulk_changed, sender=Title,
+                          dispatch_uid='titles_bulk_saved')
+
+
+@receiver((post_save, post_delete), sender=Title)
+def title_changed(sender, instance, **kwargs):
+    invalidate_titles((instance.pk,))
+    refresh_bitmaps((instance.pk,))
+
+
+@receiver(post_save, sender=Title)
+def title_index_saved(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'name' in update_fields:
+        update_title_index((instance,))
+
+
+@receiver(post_delete, sender=Title)
+def title_index_deleted(sender, instance, **kwargs):
+    update_title_index((instance,), deleted=True)
+
+
+@receiver((post_save, post_delete), sender=GenreTitle)
+def genre_title_changed(sender, instance, **kwargs):
+    invalidate_titles((instance.title_id,))
+    refresh_bitmaps((instance.title_id,))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if action not in ('pre_clear', 'post_add', 'post_remove'):
+        return
+    if not reverse:
+        title_ids = (instance.pk,)
+    elif action == 'pre_clear':
+        title_ids = list(GenreTitle.objects.filter(
+            genre=instance
+        ).values_list('title_id', flat=True))
+    else:
+        title_ids = pk_set
+    invalidate_titles(title_ids)
+    refresh_bitmaps(title_ids)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    invalidate_titles(instance.titles.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    invalidate_titles(GenreTitle.objects.filter(
+        genre=instance
+    ).values_list('title_id', flat=True))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+def bitmap_slugs_changed(sender, **kwargs):
+    transaction.on_commit(title_bitmaps.refresh_slugs)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+def bitmap_links_nulled(sender, **kwargs):
+    # Ссылки на удалённую запись обнуляются UPDATE без сигналов.
+    transaction.on_commit(title_bitmaps.invalidate)
+
+
+@receiver(pre_save, sender=Review)
+def review_moved(sender, instance, **kwargs):
+    old_title_id = instance._rated[0]
+    if old_title_id != instance.title_id:
+        invalidate_titles((old_title_id,))
+
+
+@receiver((post_save, post_delete), sender=Review)
+def review_changed(sender, instance, **kwargs):
+    invalidate_titles((instance.title_id,))
+
+
+@receiver(post_save, sender=User)
+def token_version_saved(sender, instance, **kwargs):
+    if 'token_version' in instance.__dict__:
+        transaction.on_commit(lambda: set_token_version(
+            instance.pk, instance.token_version
+        ))
+
+
+@receiver(post_delete, sender=User)
+def token_version_deleted(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_token_version(user_id))
@@ -1,9 +1,9 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    GetTokenView, ReviewViewSet, SignupView, TitleViewSet,
-                    UserViewSet)
+from .views import (CacheStatsView, CategoryViewSet, CommentViewSet,
+                    ExportView, GenreViewSet, GetTokenView, ReviewViewSet,
+                    SignupView, TitleViewSet, UserViewSet)
 
 app_name = 'api'
 
@@ -27,4 +27,6 @@ urlpatterns = [
     path('v1/auth/token/', GetTokenView.as_view(), name='get_token'),
     path('v1/', include(router_v1.urls)),
     path('v1/auth/signup/', SignupView.as_view(), name='signup'),
+    path('v1/export/<slug:dataset>/', ExportView.as_view(), name='export'),
+    path('v1/cache-stats/', CacheStatsView.as_view(), name='cache_stats'),
 ]
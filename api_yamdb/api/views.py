@@ -1,23 +1,30 @@
-from django.contrib.auth.tokens import default_token_generator
-from django.core.exceptions import ValidationError
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.conf import settings
 from django.forms.models import model_to_dict
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 
-from rest_framework import filters, permissions, status, viewsets
+from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title
+from reviews.models import Category, Genre, GenreTitle, Review, Title
 from users.models import User
 
-from .filters import TitleFilter
-from .mixins import ListCreateDeleteViewSet
+from .authentication import get_access_token
+from .autocomplete import title_index
+from .bulk import bulk_create_titles, bulk_update_titles
+from .export import (CONTENT_TYPES, DATASETS, TITLE_FIELDS, gzip_stream,
+                     iter_titles, parse_since, render, render_ndjson)
+from .filters import NormalizedSearchFilter, TitleFilter
+from .cache import get_stats
+from .mixins import (BitmapFilterMixin, CachedListMixin, ConditionalListMixin,
+                     ConditionalRetrieveMixin, FacetsMixin,
+                     ListCreateDeleteViewSet, RenderedTitleCacheMixin,
+                     ReviewNestedMixin, TitleNestedMixin)
+from .pagination import PageNumberOrCursorPagination
 from .permissions import (IsAdminModerAuthorOrReadonly, IsAdminOrSuperuser,
                           IsAdminOrSuperuserOrReadOnly)
 from .serializers import (CategorySerializer, CommentSerializer,
@@ -25,7 +32,6 @@ from .serializers import (CategorySerializer, CommentSerializer,
                           ReviewSerializer, SignupSerializer,
                           TitleCreateOrUpdateSerializer, TitleSerializer,
                           UserSerializer)
-from .validators import validate_username
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -34,8 +40,8 @@ class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticated, IsAdminOrSuperuser,)
     lookup_field = 'username'
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('username',)
+    filter_backends = (NormalizedSearchFilter,)
+    search_fields = ('username_search',)
 
     http_method_names = ('get', 'post', 'delete', 'patch')
 
@@ -61,16 +67,6 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-@receiver(post_save, sender=User)
-def post_save(sender, instance, created, **kwargs):
-    if created:
-        confirmation_code = default_token_generator.make_token(
-            instance
-        )
-        instance.confirmation_code = confirmation_code
-        instance.save()
-
-
 class GetTokenView(APIView):
     """Получам JWT-токен в ответ на отправку POST-запроса
     по адресу /api/v1/auth/token/ с данными username и confirmation_code."""
@@ -85,7 +81,7 @@ class GetTokenView(APIView):
         if confirmation_code != user.confirmation_code:
             return Response('Вы ввели неверный код подтверждения',
                             status=status.HTTP_400_BAD_REQUEST)
-        token = str(RefreshToken.for_user(user).access_token)
+        token = str(get_access_token(user))
         return Response(token, status=status.HTTP_200_OK)
 
 
@@ -97,89 +93,210 @@ class SignupView(APIView):
     def post(self, request):
         serializer = SignupSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        email = serializer.data['email']
-        try:
-            username = validate_username(serializer.data['username'])
-        except ValidationError as error:
-            return Response(error, status=status.HTTP_400_BAD_REQUEST)
-        user, _ = User.objects.get_or_create(email=email, username=username)
-        confirmation_code = user.confirmation_code
-        confirmation_message = f'Ваш код подтверждения {confirmation_code}'
-
+        user = serializer.save()
+        confirmation_message = (
+            f'Ваш код подтверждения {user.confirmation_code}'
+        )
         user.email_user(subject='Код подтверждения',
                         message=confirmation_message)
-        user.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class CategoryViewSet(ListCreateDeleteViewSet):
+class ExportView(APIView):
+    """Потоковая выгрузка всех отзывов или комментариев в NDJSON
+    по адресу /api/v1/export/reviews/ или /api/v1/export/comments/.
+    ?since=<pub_date> - только записи не старше даты,
+    ?compress=gzip - сжатие на лету."""
+    permission_classes = (IsAuthenticated, IsAdminOrSuperuser)
+
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            return Response('Неизвестный набор данных',
+                            status=status.HTTP_404_NOT_FOUND)
+        since = request.query_params.get('since')
+        if since is not None:
+            since = parse_since(since)
+            if since is None:
+                return Response('Параметр since должен быть датой',
+                                status=status.HTTP_400_BAD_REQUEST)
+        lines = render_ndjson(DATASETS[dataset](since))
+        filename = f'{dataset}.ndjson'
+        if request.query_params.get('compress') == 'gzip':
+            response = StreamingHttpResponse(
+                gzip_stream(lines), content_type='application/gzip'
+            )
+            filename += '.gz'
+        else:
+            response = StreamingHttpResponse(
+                lines, content_type=CONTENT_TYPES['ndjson']
+            )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{filename}"'
+        )
+        return response
+
+
+class CacheStatsView(APIView):
+    """Счётчики попаданий и промахов кэша ответов для мониторинга
+    по адресу /api/v1/cache-stats/."""
+    permission_classes = (IsAuthenticated, IsAdminOrSuperuser)
+
+    def get(self, request):
+        return Response(get_stats(), status=status.HTTP_200_OK)
+
+
+class CategoryViewSet(ConditionalListMixin, CachedListMixin,
+                      ListCreateDeleteViewSet):
     """Вьюсет для модели категорий."""
     queryset = Category.objects.all()
+    cache_name = 'categories'
     serializer_class = CategorySerializer
     permission_classes = (IsAuthenticatedOrReadOnly,
                           IsAdminOrSuperuserOrReadOnly,)
     lookup_field = 'slug'
     lookup_value_regex = "[-a-zA-Z0-9_]+"
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name',)
+    filter_backends = (NormalizedSearchFilter,)
+    search_fields = ('name_search',)
 
 
-class GenreViewSet(ListCreateDeleteViewSet):
+class GenreViewSet(ConditionalListMixin, CachedListMixin,
+                   ListCreateDeleteViewSet):
     """Миксины и вьюсет для модели жанров."""
     queryset = Genre.objects.all()
+    cache_name = 'genres'
     serializer_class = GenreSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,
                           IsAdminOrSuperuserOrReadOnly,)
     lookup_field = 'slug'
     lookup_value_regex = "[-a-zA-Z0-9_]+"
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name',)
+    filter_backends = (NormalizedSearchFilter,)
+    search_fields = ('name_search',)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalListMixin, ConditionalRetrieveMixin,
+                   FacetsMixin, BitmapFilterMixin, RenderedTitleCacheMixin,
+                   viewsets.ModelViewSet):
     """Вьюсет для модели произведений."""
-    queryset = Title.objects.all()
     serializer_class = TitleSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,
                           IsAdminOrSuperuserOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
+    cache_models = (Title, GenreTitle, Category, Genre, Review)
+
+    def get_queryset(self):
+        queryset = Title.objects.all()
+        fields = TitleSerializer.get_requested_fields(self.request)
+        if 'category' in fields:
+            queryset = queryset.select_related('category')
+        if 'genre' in fields:
+            queryset = queryset.prefetch_related('genre')
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'partial_update':
             return TitleCreateOrUpdateSerializer
         return TitleSerializer
 
+    @action(methods=('POST', 'PATCH'), detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Массовое создание (POST) или частичное обновление (PATCH)
+        списка произведений. Ошибки возвращаются по каждому элементу."""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response('Ожидается непустой список произведений',
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.TITLES_BULK_MAX_SIZE:
+            return Response(
+                'В одной пачке не больше '
+                f'{settings.TITLES_BULK_MAX_SIZE} произведений',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if request.method == 'POST':
+            results = bulk_create_titles(items, self.get_serializer_context())
+            success_status = status.HTTP_201_CREATED
+        else:
+            results = bulk_update_titles(items, self.get_serializer_context())
+            success_status = status.HTTP_200_OK
+        if all('errors' in result for result in results):
+            return Response(results, status=status.HTTP_400_BAD_REQUEST)
+        return Response(results, status=success_status)
+
+    @action(methods=('GET',), detail=False, url_path='autocomplete')
+    def autocomplete(self, request):
+        """id и название первых произведений, название которых
+        начинается с ?name=, из индекса в памяти (?limit= не больше
+        AUTOCOMPLETE_MAX_LIMIT)."""
+        prefix = request.query_params.get('name', '').strip()
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.AUTOCOMPLETE_LIMIT
+            ))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= settings.AUTOCOMPLETE_MAX_LIMIT:
+            return Response('limit должен быть от 1 до '
+                            f'{settings.AUTOCOMPLETE_MAX_LIMIT}',
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not prefix:
+            return Response([])
+        return Response(title_index.search(prefix, limit))
+
+    @action(methods=('GET',), detail=False, url_path='export',
+            permission_classes=(IsAuthenticated, IsAdminOrSuperuser))
+    def export(self, request):
+        """Потоковая выгрузка всего каталога в NDJSON или CSV
+        (?export_format=ndjson|csv)."""
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in CONTENT_TYPES:
+            return Response('Поддерживаются форматы: '
+                            f'{", ".join(CONTENT_TYPES)}',
+                            status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(
+            render(iter_titles(), export_format, TITLE_FIELDS),
+            content_type=CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="titles.{export_format}"'
+        )
+        return response
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(TitleNestedMixin, viewsets.ModelViewSet):
     """Вьюсет для модели отзывов."""
     serializer_class = ReviewSerializer
+    pagination_class = PageNumberOrCursorPagination
     permission_classes = (IsAuthenticatedOrReadOnly,
                           IsAdminModerAuthorOrReadonly,)
 
     def get_queryset(self):
-        return get_object_or_404(
-            Title, id=self.kwargs.get('title_id')
-        ).reviews.all()
+        queryset = self.get_title().reviews.all()
+        related = ReviewSerializer.get_requested_fields(
+            self.request
+        ).intersection(('author', 'title'))
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
         serializer.save(
             author=self.request.user,
-            title=title
+            title=self.get_title()
         )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ReviewNestedMixin, viewsets.ModelViewSet):
     """Вьюсет для модели комментариев."""
     serializer_class = CommentSerializer
+    pagination_class = PageNumberOrCursorPagination
     permission_classes = (IsAuthenticatedOrReadOnly,
                           IsAdminModerAuthorOrReadonly,)
 
     def get_queryset(self):
-        review = get_object_or_404(Review, id=self.kwargs.get('review_id'))
-        return review.comments.all()
+        queryset = self.get_review().comments.all()
+        if 'author' in CommentSerializer.get_requested_fields(self.request):
+            queryset = queryset.select_related('author')
+        return queryset
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, id=self.kwargs.get('review_id'))
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_review())
@@ -100,14 +100,70 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 DEFAULT_FROM_EMAIL = 'adminka@mail.com'
 
 
+# Поколения моделей для кэша, счётчиков страниц и ETag хранятся здесь:
+# при нескольких процессах нужен общий бэкенд (Redis, Memcached).
+# Здесь же кэшируются версии токенов пользователей: с LocMemCache другой
+# процесс узнаёт об отзыве токена (смене роли, удалении пользователя)
+# только через TOKEN_VERSION_CACHE_TIMEOUT секунд.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'titles': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'titles',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+TITLE_DETAIL_CACHE = 'titles'
+
+# Сколько секунд ответ считается свежим и сколько ещё его можно отдавать
+# устаревшим, пока один запрос пересчитывает значение.
+RESPONSE_CACHE_TTL = {
+    'categories': {'fresh': 60 * 60, 'stale': 60 * 60},
+    'genres': {'fresh': 60 * 60, 'stale': 60 * 60},
+    'titles': {'fresh': 60 * 5, 'stale': 60 * 60},
+    'facets': {'fresh': 60 * 5, 'stale': 60 * 60},
+}
+
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+
+SINGLE_FLIGHT_WAIT = 2
+
+SINGLE_FLIGHT_POLL_INTERVAL = 0.02
+
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+TITLES_BULK_MAX_SIZE = 5000
+
+EXPORT_CHUNK_SIZE = 2000
+
+AUTOCOMPLETE_LIMIT = 10
+
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Как часто процесс перестраивает индекс автодополнения, если названия
+# менялись в других процессах.
+AUTOCOMPLETE_REBUILD_INTERVAL = 5
+
+# Выше этого числа найденных произведений записи выбираются SQL-фильтром,
+# а из битовых карт берётся только количество.
+TITLE_BITMAP_MAX_IDS = 500
+
+TITLE_BITMAP_REBUILD_INTERVAL = 5
+
+# reviews.search.TitleSearchBackend ищет через LIKE на любой БД.
+TITLE_SEARCH_BACKEND = 'reviews.search.SqliteFtsBackend'
+
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CachedCountPagination',
     'PAGE_SIZE': 3,
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',),
+        'api.authentication.StatelessJWTAuthentication',),
 }
 
 SIMPLE_JWT = {
@@ -115,6 +171,11 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Версии токенов пользователей кэшируются, чтобы не читать их из БД
+# на каждый запрос. Это и есть задержка отзыва токена в других
+# процессах: увеличивать её можно только с общим бэкендом кэша.
+TOKEN_VERSION_CACHE_TIMEOUT = 5
+
 AUTH_USER_MODEL = 'users.User'
 
 SYMBOLS_TO_SHOW = 30
@@ -0,0 +1,142 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from api.bitmaps import count_bits, title_bitmaps
+from api.filters import TitleFilter
+from reviews.models import Category, Genre, GenreTitle, Title
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает фильтрацию произведений по нескольким жанрам через
+    JOIN + DISTINCT, через подзапросы TitleFilter и подсчёт по битовым
+    картам title_bitmaps.
+    Каталог генерируется внутри транзакции, которая в конце
+    откатывается, поэтому данные БД не меняются.
+    """
+    help = 'Замеряет фильтры произведений на сгенерированном каталоге.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=100_000)
+        parser.add_argument('--genres', type=int, default=50)
+        parser.add_argument('--genres-per-title', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def populate(self, options):
+        rng = random.Random(options['seed'])
+        Category.objects.bulk_create(
+            Category(name=f'Категория {idx}',
+                     slug=f'benchmark-category-{idx}')
+            for idx in range(5)
+        )
+        categories = list(Category.objects.filter(
+            slug__startswith='benchmark-category-'
+        ))
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {idx}', slug=f'benchmark-genre-{idx}')
+            for idx in range(options['genres'])
+        )
+        genres = list(Genre.objects.filter(
+            slug__startswith='benchmark-genre-'
+        ))
+        last_pk = Title.objects.aggregate(last=Max('pk'))['last'] or 0
+        Title.objects.bulk_create(
+            (Title(name=f'Произведение {idx}',
+                   year=rng.randint(1950, 2023),
+                   category=rng.choice(categories))
+             for idx in range(options['titles'])),
+            batch_size=5000
+        )
+        title_ids = Title.objects.filter(pk__gt=last_pk).values_list(
+            'pk', flat=True
+        )
+        GenreTitle.objects.bulk_create(
+            (GenreTitle(title_id=title_id, genre=genre)
+             for title_id in title_ids.iterator()
+             for genre in rng.sample(genres, options['genres_per_title'])),
+            batch_size=5000
+        )
+        return categories, genres
+
+    def measure(self, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = queryset.count()
+            list(queryset.order_by('-year', 'pk')[:10])
+            timings.append(time.perf_counter() - start)
+        return count, min(timings) * 1000
+
+    def measure_bitmaps(self, data, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = count_bits(title_bitmaps.match(data))
+            timings.append(time.perf_counter() - start)
+        return count, min(timings) * 1000
+
+    def report(self, label, join_query, data, repeat):
+        join_count, join_ms = self.measure(join_query, repeat)
+        filter_count, filter_ms = self.measure(
+            TitleFilter(data, queryset=Title.objects.all()).qs, repeat
+        )
+        bitmap_count, bitmap_ms = self.measure_bitmaps(data, repeat)
+        self.stdout.write(
+            f'{label}: JOIN+DISTINCT {join_ms:.1f} мс, '
+            f'TitleFilter {filter_ms:.1f} мс, '
+            f'битовые карты {bitmap_ms:.2f} мс, найдено {filter_count}'
+        )
+        if not join_count == filter_count == bitmap_count:
+            self.stderr.write(
+                f'{label}: результаты расходятся ({join_count}, '
+                f'{filter_count} и {bitmap_count})'
+            )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        with transaction.atomic():
+            start = time.perf_counter()
+            categories, genres = self.populate(options)
+            self.stdout.write(
+                f'Каталог: {options["titles"]} произведений, '
+                f'{len(genres)} жанров, '
+                f'{time.perf_counter() - start:.1f} с'
+            )
+            start = time.perf_counter()
+            title_bitmaps.build()
+            self.stdout.write(
+                f'Битовые карты: {time.perf_counter() - start:.1f} с'
+            )
+            slugs = [genre.slug for genre in genres[:3]]
+            self.report(
+                'genre any',
+                Title.objects.filter(genre__slug__in=slugs).distinct(),
+                {'genre': ','.join(slugs)}, repeat
+            )
+            all_query = Title.objects.all()
+            for slug in slugs[:2]:
+                all_query = all_query.filter(genre__slug=slug)
+            self.report(
+                'genre all',
+                all_query.distinct(),
+                {'genre': ','.join(slugs[:2]), 'genre_mode': 'all'}, repeat
+            )
+            category_slugs = [category.slug for category in categories[:2]]
+            self.report(
+                'genre any + category + year',
+                Title.objects.filter(
+                    genre__slug__in=slugs,
+                    category__slug__in=category_slugs,
+                    year__gte=1990, year__lte=2010
+                ).distinct(),
+                {'genre': ','.join(slugs),
+                 'category': ','.join(category_slugs),
+                 'year_min': 1990, 'year_max': 2010}, repeat
+            )
+            transaction.set_rollback(True)
+        title_bitmaps.reset()
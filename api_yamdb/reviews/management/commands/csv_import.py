@@ -1,5 +1,7 @@
 import csv
 import sqlite3
+from django.apps import apps
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
 from api_yamdb.settings import BASE_DIR
@@ -16,6 +18,9 @@ class Command(BaseCommand):
     Также присутствует зависимость от названия приложения,
     в котором создавалась БД, и от места расположения папки
     с файлами в каталоге проекта.
+    Поля модели, которых нет в файле, заполняются значениями
+    по умолчанию, после импорта пересчитываются рейтинги и
+    колонки для поиска.
     """
 
     def handle(self, *args, **options):
@@ -30,17 +35,28 @@ class Command(BaseCommand):
             with open(f'static/data/{NAME[k]}.csv', 'r',
                       encoding='utf-8') as fin:
                 dr = csv.DictReader(fin)
-                to_db = [tuple(i.values()) for i in dr]
-            if NAME[k] != 'user':
-                cur.executemany(f"INSERT INTO reviews_{NAME[k]} "
-                                f"{tuple(dr.fieldnames)} VALUES ("
-                                "?, " * (len(dr.fieldnames) - 1) + "?);",
-                                to_db)
-            else:
-                cur.executemany(f"INSERT INTO users_{NAME[k]} "
-                                f"{tuple(dr.fieldnames)} VALUES ("
-                                "?, " * (len(dr.fieldnames) - 1) + "?);",
-                                to_db)
+                app_label = 'users' if NAME[k] == 'user' else 'reviews'
+                defaults = self.get_defaults(app_label, NAME[k],
+                                             dr.fieldnames)
+                fieldnames = tuple(dr.fieldnames) + tuple(defaults)
+                to_db = [tuple(i.values()) + tuple(defaults.values())
+                         for i in dr]
+            cur.executemany(f"INSERT INTO {app_label}_{NAME[k]} "
+                            f"{fieldnames} VALUES ("
+                            + "?, " * (len(fieldnames) - 1) + "?);",
+                            to_db)
             con.commit()
 
         con.close()
+        call_command('rebuild_ratings', stdout=self.stdout)
+        call_command('normalize_search', stdout=self.stdout)
+
+    @staticmethod
+    def get_defaults(app_label, model_name, fieldnames):
+        """Значения по умолчанию для колонок, отсутствующих в файле."""
+        model = apps.get_model(app_label, model_name)
+        return {
+            field.column: field.get_default()
+            for field in model._meta.concrete_fields
+            if field.has_default() and field.column not in fieldnames
+        }
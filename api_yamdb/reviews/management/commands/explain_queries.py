@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+
+from reviews.models import Category, Genre, Review, Title
+
+
+class Command(BaseCommand):
+    """
+    Выполняет GET-запросы к основным эндпоинтам API, перехватывает
+    выполненные SELECT-запросы и печатает для каждого план выполнения
+    (EXPLAIN QUERY PLAN для SQLite, EXPLAIN для остальных БД).
+    Полные проходы по таблицам без индекса помечаются как FULL SCAN.
+    """
+    help = 'Печатает планы выполнения запросов эндпоинтов API.'
+
+    def get_urls(self):
+        title = Title.objects.order_by('pk').first()
+        review = Review.objects.order_by('pk').first()
+        category = Category.objects.order_by('pk').first()
+        genre = Genre.objects.order_by('pk').first()
+        title_id = title.pk if title else 1
+        year = title.year if title else 2000
+        category_slug = category.slug if category else 'category'
+        genre_slug = genre.slug if genre else 'genre'
+        search = title.name.split()[0] if title else 'title'
+        review_title_id = review.title_id if review else title_id
+        review_id = review.pk if review else 1
+        return (
+            '/api/v1/categories/',
+            '/api/v1/genres/',
+            '/api/v1/titles/',
+            f'/api/v1/titles/?year={year}',
+            f'/api/v1/titles/?category={category_slug}',
+            f'/api/v1/titles/?genre={genre_slug}',
+            '/api/v1/titles/?ordering=-rating',
+            f'/api/v1/titles/?search={search}',
+            f'/api/v1/titles/{title_id}/',
+            f'/api/v1/titles/{review_title_id}/reviews/',
+            f'/api/v1/titles/{review_title_id}/reviews/?pagination=cursor',
+            f'/api/v1/titles/{review_title_id}/reviews/{review_id}/'
+            'comments/',
+        )
+
+    def capture(self, url):
+        queries = []
+
+        def collect(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(collect):
+            Client().get(url)
+        return queries
+
+    def explain(self, sql, params):
+        prefix = ('EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+                  else 'EXPLAIN ')
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(str(column) for column in row)
+                    for row in cursor.fetchall()]
+
+    def handle(self, *args, **options):
+        full_scans = 0
+        for url in self.get_urls():
+            self.stdout.write(self.style.MIGRATE_HEADING(url))
+            for sql, params in self.capture(url):
+                self.stdout.write(f'  {sql}')
+                for line in self.explain(sql, params):
+                    # Виртуальные таблицы (FTS5) ищут по своему индексу.
+                    if (' SCAN ' in f' {line} ' and 'USING' not in line
+                            and 'VIRTUAL TABLE INDEX' not in line):
+                        full_scans += 1
+                        line = self.style.WARNING(f'FULL SCAN {line}')
+                    self.stdout.write(f'    {line}')
+        self.stdout.write(f'Полных проходов по таблицам: {full_scans}')
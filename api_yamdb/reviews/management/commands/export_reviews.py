@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import DATASETS, gzip_stream, parse_since, render_ndjson
+
+
+class Command(BaseCommand):
+    """
+    Потоковая выгрузка отзывов или комментариев в NDJSON для аналитики:
+    с именем автора и названием произведения, пачками по первичному
+    ключу. --since выгружает только записи не старше даты,
+    --gzip сжимает поток на лету.
+    """
+    help = 'Выгружает отзывы или комментарии в NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=tuple(DATASETS))
+        parser.add_argument('--since', help='Дата или дата со временем.')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', help='Файл для выгрузки, '
+                                             'по умолчанию stdout.')
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        since = options['since']
+        if since is not None:
+            since = parse_since(since)
+            if since is None:
+                raise CommandError('--since должен быть датой')
+        lines = render_ndjson(
+            DATASETS[options['dataset']](since, options['chunk_size'])
+        )
+        if options['gzip']:
+            if options['output']:
+                with open(options['output'], 'wb') as output:
+                    output.writelines(gzip_stream(lines))
+            else:
+                sys.stdout.buffer.writelines(gzip_stream(lines))
+        elif options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
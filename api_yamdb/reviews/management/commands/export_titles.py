@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.export import CONTENT_TYPES, TITLE_FIELDS, iter_titles, render
+
+
+class Command(BaseCommand):
+    """
+    Потоковая выгрузка каталога произведений с категорией, жанрами
+    и рейтингом в NDJSON или CSV. Произведения читаются пачками
+    по первичному ключу, поэтому расход памяти не зависит
+    от размера каталога.
+    """
+    help = 'Выгружает каталог произведений в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=tuple(CONTENT_TYPES),
+                            default='ndjson', dest='export_format')
+        parser.add_argument('--output', help='Файл для выгрузки, '
+                                             'по умолчанию stdout.')
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        lines = render(iter_titles(options['chunk_size']),
+                       options['export_format'], TITLE_FIELDS)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
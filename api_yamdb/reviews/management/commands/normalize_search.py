@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.normalization import normalize_existing
+from reviews.models import Category, Genre
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает теневые колонки для поиска (name_search,
+    username_search) у категорий, жанров и пользователей.
+    Нужна после массового импорта в обход моделей (например,
+    csv_import), когда колонки остались пустыми.
+    """
+    help = 'Пересчитывает нормализованные колонки для поиска.'
+
+    def handle(self, *args, **options):
+        for model in (Category, Genre, User):
+            with transaction.atomic():
+                updated = normalize_existing(model)
+            self.stdout.write(
+                f'{model._meta.verbose_name}: обновлено {updated}'
+            )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает с нуля сумму, количество оценок и рейтинг
+    произведений одним UPDATE по таблице отзывов.
+    Нужна после массового импорта в обход моделей
+    (например, csv_import) или для восстановления счётчиков.
+    """
+    help = 'Пересчитывает рейтинги произведений по отзывам.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Title.objects.all().rebuild_ratings()
+        self.stdout.write(f'Пересчитано произведений: {updated}')
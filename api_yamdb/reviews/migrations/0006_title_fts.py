@@ -0,0 +1,65 @@
+# Generated by Django 3.2 on 2026-10-18 15:10
+
+from django.db import migrations
+
+# В индекс пишется нормализованный текст: «ё» заменяется на «е»,
+# регистр приводит сам токенизатор unicode61.
+NAME = "replace(replace({}.name, 'ё', 'е'), 'Ё', 'Е')"
+DESCRIPTION = "replace(replace({}.description, 'ё', 'е'), 'Ё', 'Е')"
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE reviews_title_fts USING fts5("
+    "name, description, content='reviews_title', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    f"SELECT id, {NAME.format('t')}, {DESCRIPTION.format('t')} "
+    "FROM reviews_title t",
+    "CREATE TRIGGER reviews_title_fts_insert AFTER INSERT ON reviews_title "
+    "BEGIN "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    f"VALUES (new.id, {NAME.format('new')}, {DESCRIPTION.format('new')}); "
+    "END",
+    "CREATE TRIGGER reviews_title_fts_delete AFTER DELETE ON reviews_title "
+    "BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) "
+    f"VALUES ('delete', old.id, {NAME.format('old')}, "
+    f"{DESCRIPTION.format('old')}); "
+    "END",
+    "CREATE TRIGGER reviews_title_fts_update "
+    "AFTER UPDATE OF name, description ON reviews_title "
+    "BEGIN "
+    "INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, "
+    "description) "
+    f"VALUES ('delete', old.id, {NAME.format('old')}, "
+    f"{DESCRIPTION.format('old')}); "
+    "INSERT INTO reviews_title_fts(rowid, name, description) "
+    f"VALUES (new.id, {NAME.format('new')}, {DESCRIPTION.format('new')}); "
+    "END",
+)
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS reviews_title_fts_insert',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_delete',
+    'DROP TRIGGER IF EXISTS reviews_title_fts_update',
+    'DROP TABLE IF EXISTS reviews_title_fts',
+)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+from api.normalization import normalize
+
+
+def fill_name_search(apps, schema_editor):
+    for model_name in ('Category', 'Genre'):
+        model = apps.get_model('reviews', model_name)
+        objects = list(model.objects.only('pk', 'name'))
+        for obj in objects:
+            obj.name_search = normalize(obj.name)
+        model.objects.bulk_update(objects, ('name_search',),
+                                  batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='name_search',
+            field=models.CharField(default='', editable=False, max_length=256),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='name_search',
+            field=models.CharField(default='', editable=False, max_length=256),
+        ),
+        migrations.RunPython(fill_name_search, migrations.RunPython.noop),
+    ]
@@ -1,21 +1,27 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.db.models.constraints import UniqueConstraint
+from django.db.models.functions import Coalesce
 
 from users.models import User
 
 from api_yamdb.settings import SYMBOLS_TO_SHOW
 
+from api.normalization import NormalizedFieldsMixin
 from api.validators import validate_year
 
 
-class CategoryGenre(models.Model):
+class CategoryGenre(NormalizedFieldsMixin, models.Model):
     """
     Абстрактная модель для таблиц:
     Жанры и Категории.
     """
     name = models.CharField(max_length=256)
     slug = models.SlugField(unique=True, max_length=50)
+    name_search = models.CharField(max_length=256, default='',
+                                   editable=False)
+
+    normalized_fields = {'name_search': 'name'}
 
     class Meta:
         abstract = True
@@ -26,6 +32,9 @@ class Category(CategoryGenre):
     class Meta:
         ordering = ('name',)
         verbose_name = 'Категория'
+        indexes = [
+            models.Index(fields=('name',), name='category_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -36,11 +45,34 @@ class Genre(CategoryGenre):
     class Meta:
         ordering = ('name',)
         verbose_name = 'Жанр'
+        indexes = [
+            models.Index(fields=('name',), name='genre_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def rebuild_ratings(self):
+        """Пересчитывает счётчики рейтинга одним UPDATE по отзывам."""
+        reviews = Review.objects.filter(
+            title=models.OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            rating_sum=Coalesce(models.Subquery(
+                reviews.annotate(total=models.Sum('score')).values('total')
+            ), 0),
+            rating_count=Coalesce(models.Subquery(
+                reviews.annotate(total=models.Count('pk')).values('total')
+            ), 0),
+            rating=models.Subquery(
+                reviews.annotate(total=models.Avg('score')).values('total')
+            )
+        )
+
+
 class Title(models.Model):
     """Модель произведения."""
     name = models.CharField(max_length=256,
@@ -61,9 +93,35 @@ class Title(models.Model):
         blank=True,
         null=True,
         verbose_name='Описание')
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок',
+        default=0,
+        editable=False
+    )
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок',
+        default=0,
+        editable=False
+    )
+    rating = models.FloatField(
+        'Рейтинг',
+        null=True,
+        editable=False
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ('name',)
+        indexes = [
+            models.Index(fields=('name',), name='title_name_idx'),
+            models.Index(fields=('year', 'name'), name='title_year_name_idx'),
+            models.Index(fields=('category', 'name'),
+                         name='title_category_name_idx'),
+            models.Index(fields=('rating',), name='title_rating_idx'),
+            models.Index(fields=('rating_count',),
+                         name='title_rating_count_idx'),
+        ]
 
 
 class GenreTitle(models.Model):
@@ -83,6 +141,10 @@ class GenreTitle(models.Model):
         constraints = [
             UniqueConstraint(fields=['genre', 'title'], name='genre_and_title')
         ]
+        indexes = [
+            models.Index(fields=('title', 'genre'),
+                         name='genretitle_title_genre_idx'),
+        ]
 
 
 class Review(models.Model):
@@ -114,10 +176,19 @@ class Review(models.Model):
                 name='unique review'
             )
         ]
+        indexes = [
+            models.Index(fields=('title', 'pub_date', 'id'),
+                         name='review_title_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:SYMBOLS_TO_SHOW]
 
+    def save(self, *args, **kwargs):
+        """Сохранение отзыва и пересчёт рейтинга в одной транзакции."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Модель комментария к отзыву."""
@@ -134,6 +205,10 @@ class Comment(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=('review', 'pub_date', 'id'),
+                         name='comment_review_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:SYMBOLS_TO_SHOW]
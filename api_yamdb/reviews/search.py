@@ -0,0 +1,70 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from api.normalization import normalize
+
+FTS_TABLE = 'reviews_title_fts'
+# Вес совпадения в названии относительно описания для bm25.
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+TERM_RE = re.compile(r'\w+')
+
+
+def get_terms(query):
+    return TERM_RE.findall(normalize(query))
+
+
+class TitleSearchBackend:
+    """Поиск произведений по вхождению каждого слова запроса в название
+    или описание. Работает на любой БД, но проходит всю таблицу."""
+
+    def search(self, queryset, query):
+        for term in get_terms(query):
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(description__icontains=term)
+            )
+        return queryset
+
+
+class SqliteFtsBackend(TitleSearchBackend):
+    """Поиск по индексу FTS5 ``reviews_title_fts``.
+
+    Каждое слово запроса ищется как префикс, результаты упорядочены по
+    bm25 с большим весом названия. Индекс поддерживают триггеры БД
+    (миграция 0006), поэтому он синхронен с любой записью в таблицу
+    произведений, включая массовые операции и сырой SQL.
+    """
+
+    def match_expression(self, terms):
+        return ' AND '.join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        if connection.vendor != 'sqlite':
+            return super().search(queryset, query)
+        terms = get_terms(query)
+        if not terms:
+            return queryset
+        # У виртуальной таблицы нет модели. Фильтр - несвязанный
+        # подзапрос, поэтому queryset можно вкладывать в другие запросы
+        # (например, для фасетов); ранг выбирается только для сортировки.
+        match = self.match_expression(terms)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT bm25({FTS_TABLE}, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}) '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = reviews_title.id',
+            (match,)
+        )).order_by('search_rank', 'pk')
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    return import_string(settings.TITLE_SEARCH_BACKEND)()
@@ -0,0 +1,61 @@
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+
+from .models import Review, Title
+
+# Массовая запись произведений в обход save(): titles - список
+# произведений, created - созданы они или изменены.
+titles_bulk_saved = Signal()
+
+
+def shift_rating(title_id, score_delta, count_delta):
+    """Сдвигает счётчики рейтинга произведения одним UPDATE."""
+    if not title_id or not (score_delta or count_delta):
+        return
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+        rating=(
+            Cast(F('rating_sum') + score_delta, FloatField())
+            / NullIf(F('rating_count') + count_delta, 0)
+        )
+    )
+
+
+def remember_score(instance):
+    # Читаем __dict__, чтобы не подгружать отложенные поля.
+    instance._rated = (instance.__dict__.get('title_id'),
+                       instance.__dict__.get('score'))
+
+
+@receiver(post_init, sender=Review)
+def review_post_init(sender, instance, **kwargs):
+    remember_score(instance)
+
+
+@receiver(post_save, sender=Review)
+def review_post_save(sender, instance, created, raw=False,
+                     update_fields=None, **kwargs):
+    if raw:
+        return
+    old_title_id = instance._rated[0]
+    if created:
+        shift_rating(instance.title_id, instance.score, 1)
+    elif update_fields is None or {'score', 'title'} & set(update_fields):
+        # Оценка, запомненная при загрузке, могла устареть: параллельный
+        # запрос успел её изменить. Пересчёт по отзывам не зависит от неё.
+        Title.objects.filter(
+            pk__in={old_title_id, instance.title_id} - {None}
+        ).rebuild_ratings()
+    remember_score(instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_post_delete(sender, instance, **kwargs):
+    old_title_id, old_score = instance._rated
+    if old_score is None:
+        Title.objects.filter(pk=instance.title_id).rebuild_ratings()
+    else:
+        shift_rating(old_title_id, -old_score, -1)
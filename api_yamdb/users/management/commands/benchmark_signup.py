@@ -0,0 +1,96 @@
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.views import SignupView
+from users.models import User
+
+PREFIX = 'benchmark_signup_'
+
+
+class Command(BaseCommand):
+    """
+    Замеряет пропускную способность регистрации при параллельных
+    запросах. Каждая пара username/email отправляется несколько раз, а
+    часть запросов занимает тот же username с другой почтой, поэтому
+    потоки гоняются за одни и те же строки. После замера проверяется,
+    что ни один запрос не упал и на каждый username приходится ровно
+    один пользователь. Созданные пользователи удаляются, письма не
+    отправляются.
+    """
+    help = 'Замеряет регистрацию пользователей при параллельных запросах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--conflicts', type=float, default=0.1)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def make_requests(self, options):
+        rng = random.Random(options['seed'])
+        requests = []
+        for idx in range(options['users']):
+            username = f'{PREFIX}{idx}'
+            requests.extend(
+                {'username': username, 'email': f'{username}@yamdb.fake'}
+                for _ in range(options['repeat'])
+            )
+            if rng.random() < options['conflicts']:
+                requests.append({'username': username,
+                                 'email': f'{username}_other@yamdb.fake'})
+        rng.shuffle(requests)
+        return requests
+
+    def signup(self, data):
+        view = SignupView.as_view()
+        request = APIRequestFactory().post('/api/v1/auth/signup/', data)
+        start = time.perf_counter()
+        try:
+            status_code = view(request).status_code
+        except Exception as error:
+            status_code = type(error).__name__
+        finally:
+            connection.close()
+        return status_code, time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        User.objects.filter(username__startswith=PREFIX).delete()
+        requests = self.make_requests(options)
+        email_backend = 'django.core.mail.backends.locmem.EmailBackend'
+        with override_settings(EMAIL_BACKEND=email_backend):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(options['threads']) as executor:
+                results = list(executor.map(self.signup, requests))
+            elapsed = time.perf_counter() - start
+        statuses = Counter(status_code for status_code, _ in results)
+        timings = sorted(timing for _, timing in results)
+        self.stdout.write(
+            f'{len(requests)} запросов в {options["threads"]} потоков: '
+            f'{len(requests) / elapsed:.0f} запросов/с, '
+            f'p50 {timings[len(timings) // 2] * 1000:.1f} мс, '
+            f'p95 {timings[int(len(timings) * 0.95)] * 1000:.1f} мс'
+        )
+        self.stdout.write(
+            'Ответы: ' + ', '.join(
+                f'{status_code}: {count}'
+                for status_code, count in sorted(statuses.items(), key=str)
+            )
+        )
+        users = User.objects.filter(username__startswith=PREFIX)
+        created = users.count()
+        duplicated = created - users.values('username').distinct().count()
+        if created != options['users'] or duplicated:
+            self.stderr.write(
+                f'Ожидалось {options["users"]} пользователей, '
+                f'создано {created}'
+            )
+        if set(statuses) - {200, 400}:
+            self.stderr.write('Часть запросов завершилась ошибкой')
+        users.delete()
@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+from api.normalization import normalize
+
+
+def fill_username_search(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    users = list(User.objects.only('pk', 'username'))
+    for user in users:
+        user.username_search = normalize(user.username)
+    User.objects.bulk_update(users, ('username_search',), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_user_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='username_search',
+            field=models.CharField(default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(fill_username_search,
+                             migrations.RunPython.noop),
+    ]
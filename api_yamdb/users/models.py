@@ -1,11 +1,13 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.tokens import default_token_generator
 
 from .roles import UserRole
+from api.normalization import NormalizedFieldsMixin
 from api.validators import validate_username
 
 
-class User(AbstractUser):
+class User(NormalizedFieldsMixin, AbstractUser):
     """Модель пользователя."""
     username = models.CharField(
         max_length=150,
@@ -14,6 +16,11 @@ class User(AbstractUser):
         null=False,
         validators=[validate_username]
     )
+    username_search = models.CharField(
+        max_length=150,
+        default='',
+        editable=False
+    )
     role = models.CharField(
         'Роль',
         max_length=20,
@@ -36,6 +43,15 @@ class User(AbstractUser):
         max_length=50,
         null=True
     )
+    token_version = models.PositiveIntegerField(
+        'Версия токенов',
+        default=0,
+        editable=False
+    )
+
+    normalized_fields = {'username_search': 'username'}
+    # Изменение этих полей отзывает выданные токены.
+    token_fields = ('role', 'is_superuser', 'is_active')
 
     class Meta:
         ordering = ['-id']
@@ -49,6 +65,38 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._token_state = instance.get_token_state()
+        return instance
+
+    def get_token_state(self):
+        return {name: self.__dict__[name] for name in self.token_fields
+                if name in self.__dict__}
+
+    def refresh_from_db(self, using=None, fields=None):
+        # Обращение к одному отложенному полю загружает все отложенные
+        # одним запросом: пользователь из токена загружен частично.
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields)
+
+    def save(self, *args, **kwargs):
+        # Код подтверждения записывается тем же INSERT, что и пользователь.
+        if self._state.adding and not self.confirmation_code:
+            self.confirmation_code = default_token_generator.make_token(self)
+        state = getattr(self, '_token_state', {})
+        if any(self.__dict__.get(name) != value
+               for name, value in state.items()):
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._token_state = self.get_token_state()
+
     @property
     def is_admin(self):
         return self.role == UserRole.ADMIN or self.is_superuser
@@ -1,6 +1,9 @@
 import os
 import sys
 
+import pytest
+from django.conf import settings
+from django.core.cache import caches
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +36,17 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_title_indexes():
+    from api.autocomplete import title_index
+    from api.bitmaps import title_bitmaps
+    title_index.reset()
+    title_bitmaps.reset()
@@ -2,7 +2,12 @@ from http import HTTPStatus
 
 import pytest
 from django.core import mail
+from django.db import connection
+from django.db.models import F
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
 
 from tests.utils import (invalid_data_for_user_patch_and_creation,
                          invalid_data_for_username_and_email_fields)
@@ -373,3 +378,136 @@ class Test00UserRegistration:
             'пользователя, созданного администратором,  возвращает ответ '
             'со статусом 200.'
         )
+
+    def test_stateless_token(self, client, django_user_model,
+                             django_assert_num_queries):
+        user = django_user_model.objects.create_user(
+            username='token_user', email='token_user@yamdb.fake',
+            role='admin', bio='token bio', confirmation_code='token-code'
+        )
+
+        def get_client():
+            token = client.post(self.url_token, data={
+                'username': user.username,
+                'confirmation_code': user.confirmation_code
+            }).json()
+            api_client = APIClient()
+            api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            return api_client
+
+        admin_client = get_client()
+        with django_assert_num_queries(0):
+            response = admin_client.get('/api/v1/cache-stats/')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что токен из `{self.url_token}` содержит роль '
+            'и пользователь не загружается из БД на каждый запрос.'
+        )
+        response = admin_client.get('/api/v1/users/me/')
+        assert response.json()['bio'] == 'token bio', (
+            'Проверьте, что поля пользователя, которых нет в токене, '
+            'подгружаются из БД.'
+        )
+
+        user.role = 'user'
+        user.save()
+        response = admin_client.get('/api/v1/cache-stats/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что смена роли отзывает выданные токены.'
+        )
+        user_client = get_client()
+        response = user_client.get('/api/v1/cache-stats/')
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        response = user_client.patch(
+            '/api/v1/users/me/',
+            data={'bio': 'new bio', 'username': 'renamed_user'}
+        )
+        assert response.json()['bio'] == 'new bio'
+        response = user_client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что изменение профиля не отзывает токен.'
+        )
+        assert response.json()['username'] == 'renamed_user'
+
+    def test_signup_single_write(self, client, django_user_model,
+                                 django_assert_num_queries):
+        valid_data = {
+            'email': 'single_write@yamdb.fake',
+            'username': 'single_write'
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(self.url_signup, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        statements = [query['sql'].split()[0] for query in context
+                      if query['sql'] != 'BEGIN']
+        assert statements == ['SELECT', 'INSERT'], (
+            f'Проверьте, что POST-запрос к `{self.url_signup}` проверяет '
+            'данные одним запросом и создаёт пользователя одним INSERT.'
+        )
+        user = django_user_model.objects.get(username='single_write')
+        assert user.confirmation_code, (
+            'Проверьте, что код подтверждения записывается вместе '
+            'с пользователем.'
+        )
+        with django_assert_num_queries(1):
+            response = client.post(self.url_signup, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        assert mail.outbox[-1].body.endswith(user.confirmation_code), (
+            'Проверьте, что повторная регистрация отправляет тот же код.'
+        )
+
+    def test_signup_race(self, django_user_model):
+        from api.serializers import SignupSerializer
+
+        valid_data = {
+            'email': 'race@yamdb.fake',
+            'username': 'race_user'
+        }
+        serializer = SignupSerializer(data=valid_data)
+        assert serializer.is_valid()
+        conflict = SignupSerializer(data={
+            'email': 'race_other@yamdb.fake',
+            'username': 'race_user'
+        })
+        assert conflict.is_valid()
+        # Параллельный запрос регистрирует пользователя после проверки.
+        winner = django_user_model.objects.create(**valid_data)
+        assert serializer.save() == winner, (
+            'Проверьте, что при одновременной регистрации с одинаковыми '
+            'данными возвращается уже созданный пользователь.'
+        )
+        with pytest.raises(ValidationError):
+            conflict.save()
+        assert django_user_model.objects.filter(
+            username='race_user'
+        ).count() == 1
+
+    def test_token_revoked_in_other_process(self, client, settings,
+                                            django_user_model):
+        settings.TOKEN_VERSION_CACHE_TIMEOUT = 0
+        user = django_user_model.objects.create_user(
+            username='revoked_user', email='revoked_user@yamdb.fake',
+            role='admin'
+        )
+        token = client.post(self.url_token, data={
+            'username': user.username,
+            'confirmation_code': user.confirmation_code
+        }).json()
+        api_client = APIClient()
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert api_client.get('/api/v1/cache-stats/').status_code == (
+            HTTPStatus.OK
+        )
+        # Запись другого процесса: кэш этого процесса о ней не знает.
+        django_user_model.objects.filter(pk=user.pk).update(
+            role='user', token_version=F('token_version') + 1
+        )
+        assert api_client.get('/api/v1/cache-stats/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), (
+            'Проверьте, что версия токенов кэшируется не дольше '
+            '`TOKEN_VERSION_CACHE_TIMEOUT`.'
+        )
+        django_user_model.objects.filter(pk=user.pk).delete()
+        assert api_client.get('/api/v1/cache-stats/').status_code == (
+            HTTPStatus.UNAUTHORIZED
+        ), 'Проверьте, что токен удалённого пользователя не принимается.'
@@ -131,6 +131,25 @@ class Test01UserAPI:
             f'корректными данными: {", ".join(admin_as_dict.keys())}.'
         )
 
+    def test_04_03_users_get_search_cyrillic(self, admin_client,
+                                             django_user_model):
+        for username in ('Алёна', 'алексей', 'Василий'):
+            django_user_model.objects.create_user(
+                username=username, email=f'{len(username)}{username}@ya.ru'
+            )
+        url = '/api/v1/users/'
+        for search, expected in (('але', ['алексей', 'Алёна']),
+                                 ('АЛЕН', ['Алёна']),
+                                 ('лий', ['Василий']),
+                                 ('лёш', [])):
+            response = admin_client.get(url, {'search': search})
+            usernames = [user['username']
+                         for user in response.json()['results']]
+            assert usernames == expected, (
+                f'Проверьте, что поиск `{url}?search=` ищет по вхождению '
+                'в `username` без учёта регистра и «ё»/«е».'
+            )
+
     def test_04_01_users_get_admin_only(self, user_client, moderator_client):
         url = '/api/v1/users/'
         for client in (user_client, moderator_client):
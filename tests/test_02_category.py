@@ -139,3 +139,25 @@ class Test02CategoryAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, url, data, 'модератора',
                           categories, HTTPStatus.FORBIDDEN)
+
+    def test_06_category_search_cyrillic(self, admin_client, client):
+        url = '/api/v1/categories/'
+        for name, slug in (('Ёлочные игрушки', 'toys'), ('ФИЛЬМ', 'films'),
+                           ('Книги', 'books')):
+            admin_client.post(url, data={'name': name, 'slug': slug})
+
+        for search, expected in (('елоч', ['Ёлочные игрушки']),
+                                 ('фильм', ['ФИЛЬМ']),
+                                 ('ИГРУШ', ['Ёлочные игрушки']),
+                                 ('НИГ и', ['Книги'])):
+            response = client.get(url, {'search': search})
+            names = [item['name'] for item in response.json()['results']]
+            assert names == expected, (
+                f'Проверьте, что поиск `{url}?search=` не различает '
+                'регистр кириллицы и букв «ё»/«е».'
+            )
+
+        admin_client.delete(f'{url}films/')
+        admin_client.post(url, data={'name': 'Фильмы', 'slug': 'films'})
+        response = client.get(url, {'search': 'ФИЛЬМЫ'})
+        assert response.json()['count'] == 1
@@ -1,3 +1,4 @@
+import json
 from http import HTTPStatus
 
 import pytest
@@ -316,3 +317,176 @@ class Test04TitleAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, url, data, 'модератора',
                           titles, HTTPStatus.FORBIDDEN)
+
+    def test_06_titles_bulk(self, admin_client, user_client):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        url = '/api/v1/titles/bulk/'
+        items = [
+            {
+                'name': f'Произведение {idx}',
+                'year': 2000 + idx,
+                'genre': [genres[0]['slug'], genres[idx % 3]['slug']],
+                'category': categories[idx % 2]['slug']
+            }
+            for idx in range(5)
+        ]
+        items.append({'name': 'Без жанра', 'year': 2000,
+                      'genre': ['unknown'], 'category': 'films'})
+
+        response = user_client.post(url, data=items, format='json')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что POST-запрос пользователя с ролью `user` к '
+            f'`{url}` возвращает ответ со статусом 403.'
+        )
+
+        response = admin_client.post(url, data=items, format='json')
+        assert response.status_code == HTTPStatus.CREATED, (
+            f'Проверьте, что POST-запрос администратора к `{url}` со '
+            'списком произведений возвращает ответ со статусом 201.'
+        )
+        results = response.json()
+        assert len(results) == len(items)
+        assert all('id' in result for result in results[:5])
+        assert 'genre' in results[5]['errors'], (
+            f'Проверьте, что POST-запрос к `{url}` возвращает ошибки '
+            'для каждого некорректного элемента, не отменяя остальные.'
+        )
+        response = admin_client.get('/api/v1/titles/')
+        assert response.json()['count'] == 5
+
+        title_id = results[1]['id']
+        updates = [
+            {'id': title_id, 'year': 1999, 'genre': [genres[2]['slug']]},
+            {'id': 999999, 'year': 1999},
+        ]
+        response = admin_client.patch(url, data=updates, format='json')
+        assert response.status_code == HTTPStatus.OK, (
+            f'Проверьте, что PATCH-запрос администратора к `{url}` '
+            'возвращает ответ со статусом 200.'
+        )
+        assert 'id' in response.json()[1]['errors']
+        title = admin_client.get(f'/api/v1/titles/{title_id}/').json()
+        assert title['year'] == 1999
+        assert [genre['slug'] for genre in title['genre']] == [
+            genres[2]['slug']
+        ], (
+            f'Проверьте, что PATCH-запрос к `{url}` обновляет жанры '
+            'произведений.'
+        )
+
+    def test_07_titles_export(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/export/'
+
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            f'Проверьте, что GET-запрос пользователя с ролью `user` к '
+            f'`{url}` возвращает ответ со статусом 403.'
+        )
+
+        response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        rows = [json.loads(line) for line in b''.join(
+            response.streaming_content
+        ).decode().splitlines()]
+        assert sorted(row['id'] for row in rows) == sorted(
+            title['id'] for title in titles
+        ), (
+            f'Проверьте, что `{url}` выгружает все произведения в NDJSON.'
+        )
+        row = next(row for row in rows if row['id'] == titles[0]['id'])
+        assert sorted(row['genre']) == sorted(titles[0]['genre'])
+        assert row['category'] == titles[0]['category']
+
+        response = admin_client.get(url, {'export_format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert response['Content-Type'] == 'text/csv'
+        assert lines[0] == 'id,name,year,description,category,genre,rating'
+        assert len(lines) == len(titles) + 1
+
+    def test_08_titles_search(self, admin_client, client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+        data = {
+            'name': 'Ёжик в тумане',
+            'year': 1975,
+            'genre': titles[1]['genre'],
+            'category': titles[0]['category'],
+            'description': 'Мультфильм про терминатора наоборот'
+        }
+        hedgehog = admin_client.post(url, data=data).json()
+
+        def search(query):
+            response = client.get(url, {'search': query})
+            assert response.status_code == HTTPStatus.OK
+            return [title['id'] for title in response.json()['results']]
+
+        assert search('терм') == [titles[0]['id'], hedgehog['id']], (
+            f'Проверьте, что `{url}?search=` ищет слова по префиксу в '
+            'названии и описании и выше ставит совпадения в названии.'
+        )
+        assert search('ежик туман') == [hedgehog['id']], (
+            f'Проверьте, что `{url}?search=` не различает регистр и '
+            '«ё»/«е» и требует совпадения всех слов.'
+        )
+        assert search('ки яй') == []
+        assert search('yippie KI') == [titles[1]['id']]
+
+        admin_client.patch(f'{url}{titles[1]["id"]}/',
+                           data={'name': 'Туманность Андромеды'})
+        assert search('туман') == [titles[1]['id'], hedgehog['id']]
+        assert search('орешек') == [], (
+            'Проверьте, что поисковый индекс обновляется при изменении '
+            'произведения.'
+        )
+        admin_client.patch(f'{url}bulk/', data=[
+            {'id': hedgehog['id'], 'description': 'Про лошадку'}
+        ], format='json')
+        assert search('терм') == [titles[0]['id']]
+        admin_client.delete(f'{url}{titles[0]["id"]}/')
+        assert search('терм') == [], (
+            'Проверьте, что удалённое произведение пропадает из поиска.'
+        )
+
+    def test_09_titles_autocomplete(self, admin_client, client,
+                                    django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/autocomplete/'
+        terminator = {'id': titles[0]['id'], 'name': titles[0]['name']}
+
+        response = client.get(url, {'name': 'тер'})
+        assert response.status_code == HTTPStatus.OK, (
+            f'Эндпоинт `{url}` не найден или недоступен без авторизации.'
+        )
+        assert response.json() == [terminator], (
+            f'Проверьте, что `{url}?name=` возвращает `id` и `name` '
+            'произведений, название которых начинается с префикса.'
+        )
+        with django_assert_num_queries(0):
+            client.get(url, {'name': 'Кре'})
+
+        data = {'name': 'Тёрн', 'year': 2000, 'genre': titles[0]['genre'],
+                'category': titles[0]['category']}
+        created = admin_client.post('/api/v1/titles/', data=data).json()
+        response = client.get(url, {'name': 'ТЕР'})
+        assert response.json() == [
+            terminator, {'id': created['id'], 'name': 'Тёрн'}
+        ], (
+            f'Проверьте, что `{url}` сразу учитывает новые произведения.'
+        )
+        assert client.get(url, {'name': 'т', 'limit': 1}).json() == [
+            terminator
+        ]
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/',
+                           data={'name': 'Чужой'})
+        admin_client.delete(f'/api/v1/titles/{created["id"]}/')
+        assert client.get(url, {'name': 'тер'}).json() == [], (
+            f'Проверьте, что `{url}` учитывает изменение и удаление '
+            'произведений.'
+        )
+        assert client.get(url, {'name': 'чуж'}).json() == [
+            {'id': titles[0]['id'], 'name': 'Чужой'}
+        ]
+        response = client.get(url, {'name': 'т', 'limit': 0})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
@@ -1,3 +1,5 @@
+import gzip
+import json
 from http import HTTPStatus
 
 import pytest
@@ -381,3 +383,73 @@ class Test06CommentAPI:
             'Проверьте, что DELETE-запрос неавторизованного пользователя к '
             f'`{url}` возвращает ответ со статусом 401.'
         )
+
+    def test_07_comment_review_of_other_title(self, admin_client, admin,
+                                              user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        comments, reviews, titles = create_comments(admin_client, author_map)
+        url = '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+
+        response = user_client.get(
+            url.format(title_id=titles[1]['id'], review_id=reviews[0]['id'])
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает ответ со '
+            'статусом 404, если отзыв не относится к произведению.'
+        )
+        response = user_client.post(
+            url.format(title_id=titles[1]['id'], review_id=reviews[0]['id']),
+            data={'text': 'Не туда'}
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Проверьте, что POST-запрос к `{url}` возвращает ответ со '
+            'статусом 404, если отзыв не относится к произведению.'
+        )
+        response = user_client.get(
+            url.format(title_id=titles[1]['id'], review_id=reviews[0]['id'])
+            + f'{comments[0]["id"]}/'
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Проверьте, что GET-запрос к `{url}<comment_id>/` возвращает '
+            'ответ со статусом 404, если отзыв не относится к произведению.'
+        )
+
+    def test_08_reviews_and_comments_export(self, admin_client, admin,
+                                            user_client, user):
+        author_map = {admin: admin_client, user: user_client}
+        comments, reviews, titles = create_comments(admin_client, author_map)
+
+        response = user_client.get('/api/v1/export/reviews/')
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что выгрузка отзывов недоступна пользователю с '
+            'ролью `user`.'
+        )
+
+        response = admin_client.get('/api/v1/export/reviews/')
+        assert response.status_code == HTTPStatus.OK
+        rows = [json.loads(line) for line in b''.join(
+            response.streaming_content
+        ).decode().splitlines()]
+        assert {row['id'] for row in rows} == {
+            review['id'] for review in reviews
+        }
+        assert {row['title'] for row in rows} == {titles[0]['name']}
+        assert {row['author'] for row in rows} == {
+            admin.username, user.username
+        }
+
+        response = admin_client.get('/api/v1/export/comments/',
+                                    {'compress': 'gzip'})
+        rows = gzip.decompress(
+            b''.join(response.streaming_content)
+        ).decode().splitlines()
+        assert len(rows) == len(comments), (
+            'Проверьте, что выгрузка комментариев сжимается в gzip.'
+        )
+
+        response = admin_client.get('/api/v1/export/comments/',
+                                    {'since': '2999-01-01'})
+        assert b''.join(response.streaming_content) == b''
+        response = admin_client.get('/api/v1/export/comments/',
+                                    {'since': 'вчера'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
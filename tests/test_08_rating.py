@@ -0,0 +1,112 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Review, Title
+from tests.utils import create_reviews, create_single_review
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08RatingAPI:
+
+    def get_rating(self, client, title_id):
+        response = client.get(f'/api/v1/titles/{title_id}/')
+        assert response.status_code == HTTPStatus.OK
+        return response.json().get('rating')
+
+    def test_01_rating_follows_review_changes(self, admin_client, admin,
+                                              user, user_client, moderator,
+                                              moderator_client):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/reviews/'
+        assert self.get_rating(admin_client, title_id) == 5, (
+            'Проверьте, что рейтинг произведения равен средней оценке '
+            'оставленных отзывов.'
+        )
+
+        response = user_client.patch(f'{url}{reviews[1]["id"]}/',
+                                     data={'score': 8})
+        assert response.status_code == HTTPStatus.OK
+        assert self.get_rating(admin_client, title_id) == 6, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'изменении оценки в отзыве.'
+        )
+
+        response = moderator_client.delete(f'{url}{reviews[2]["id"]}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(admin_client, title_id) == 6.5, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'удалении отзыва.'
+        )
+
+        response = admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(admin_client, title_id) == 5, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'удалении автора отзыва.'
+        )
+
+        response = admin_client.delete(f'{url}{reviews[0]["id"]}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.get_rating(admin_client, title_id) is None, (
+            'Проверьте, что у произведения без отзывов рейтинг равен `None`.'
+        )
+
+    def test_02_titles_ordering_and_rating_range(self, admin_client, admin,
+                                                 user, user_client):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        create_single_review(user_client, titles[1]['id'], 'Шедевр', 9)
+        url = '/api/v1/titles/'
+
+        response = admin_client.get(url, {'ordering': '-rating'})
+        assert response.status_code == HTTPStatus.OK
+        ids = [title['id'] for title in response.json()['results']]
+        assert ids == [titles[1]['id'], titles[0]['id']], (
+            f'Проверьте, что `{url}?ordering=-rating` возвращает '
+            'произведения по убыванию рейтинга.'
+        )
+
+        response = admin_client.get(url, {'rating_min': 6})
+        ids = [title['id'] for title in response.json()['results']]
+        assert ids == [titles[1]['id']], (
+            f'Проверьте, что `{url}?rating_min=` отбрасывает произведения '
+            'с рейтингом ниже заданного.'
+        )
+
+        response = admin_client.get(url, {'rating_max': 6})
+        ids = [title['id'] for title in response.json()['results']]
+        assert ids == [titles[0]['id']], (
+            f'Проверьте, что `{url}?rating_max=` отбрасывает произведения '
+            'с рейтингом выше заданного.'
+        )
+
+    def test_03_concurrent_score_edits(self, admin_client, admin,
+                                      user, user_client):
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        # Два запроса загрузили отзыв с оценкой 5 и сохраняют свои.
+        first = Review.objects.get(pk=reviews[0]['id'])
+        second = Review.objects.get(pk=reviews[0]['id'])
+        first.score = 8
+        first.save()
+        second.score = 2
+        second.save()
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (7, 2), (
+            'Проверьте, что счётчики рейтинга совпадают с сохранёнными '
+            'оценками при одновременном изменении отзыва.'
+        )
+        assert self.get_rating(admin_client, title.pk) == 3.5
+        response = admin_client.patch(f'/api/v1/titles/{title.pk}/',
+                                      data={'year': 2001})
+        assert response.json()['rating'] == 3.5, (
+            'Проверьте, что ответ на изменение произведения содержит '
+            'рейтинг без округления.'
+        )
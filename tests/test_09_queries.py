@@ -0,0 +1,659 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+
+from api.autocomplete import title_index
+from api.bitmaps import TitleBitmapIndex, title_bitmaps
+from api.cache import (generation_key, get_generations, get_or_compute,
+                       get_stats)
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title)
+from tests.utils import create_single_review
+from users.models import User
+
+
+@pytest.fixture
+def catalog():
+    category = Category.objects.create(name='Фильм', slug='films')
+    genres = [
+        Genre.objects.create(name=f'Жанр {idx}', slug=f'genre-{idx}')
+        for idx in range(3)
+    ]
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {idx}', year=2000, category=category)
+        for idx in range(100)
+    )
+    titles = list(Title.objects.all())
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genre)
+        for title in titles for genre in genres
+    )
+    return titles
+
+
+@pytest.fixture
+def discussion(catalog):
+    User.objects.bulk_create(
+        User(username=f'user{idx}', email=f'user{idx}@yamdb.fake')
+        for idx in range(100)
+    )
+    authors = list(User.objects.all())
+    title = catalog[0]
+    Review.objects.bulk_create(
+        Review(title=title, author=author, text='Отзыв', score=5)
+        for author in authors
+    )
+    review = Review.objects.filter(title=title).first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=author, text='Комментарий')
+        for author in authors
+    )
+    return title, review
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09Queries:
+
+    @pytest.mark.parametrize('page_size', (1, 10, 100))
+    def test_01_titles_list_queries(self, client, catalog, page_size,
+                                    monkeypatch,
+                                    django_assert_num_queries):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        # COUNT для пагинации, произведения с категориями, жанры.
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == page_size, (
+            'Проверьте, что список произведений отдаётся постранично.'
+        )
+
+    def test_02_title_detail_queries(self, client, catalog,
+                                     django_assert_num_queries):
+        # Произведение с категорией и жанры.
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{catalog[0].id}/')
+        assert len(response.json()['genre']) == 3
+
+    @pytest.mark.parametrize('page_size', (10, 100))
+    def test_03_reviews_list_queries(self, client, discussion, page_size,
+                                     monkeypatch,
+                                     django_assert_num_queries):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        title, _ = discussion
+        # Произведение, COUNT для пагинации, отзывы с авторами.
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert len(response.json()['results']) == page_size
+
+    @pytest.mark.parametrize('page_size', (10, 100))
+    def test_04_comments_list_queries(self, client, discussion, page_size,
+                                      monkeypatch,
+                                      django_assert_num_queries):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        title, review = discussion
+        # Отзыв, COUNT для пагинации, комментарии с авторами.
+        with django_assert_num_queries(3):
+            response = client.get(
+                f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+            )
+        assert len(response.json()['results']) == page_size
+
+    def test_05_reviews_cursor_pagination(self, client, discussion,
+                                          django_assert_num_queries):
+        title, _ = discussion
+        # Половина отзывов с одинаковым pub_date: позиция курсора должна
+        # различать их по id.
+        Review.objects.filter(
+            pk__in=Review.objects.filter(title=title).order_by('pk')
+            .values('pk')[:50]
+        ).update(pub_date=timezone.now())
+        url = (f'/api/v1/titles/{title.id}/reviews/'
+               '?pagination=cursor&page_size=30')
+        # Произведение и страница отзывов с авторами, без COUNT.
+        with django_assert_num_queries(2):
+            response = client.get(url)
+        assert len(response.json()['results']) == 30, (
+            'Проверьте, что курсорная пагинация учитывает `page_size`.'
+        )
+        ids, pages = [], []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                data = client.get(url).json()
+            assert not any('OFFSET' in query['sql'] for query in context), (
+                'Проверьте, что курсорная пагинация не использует OFFSET.'
+            )
+            assert 'count' not in data
+            ids.extend(review['id'] for review in data['results'])
+            pages.append([review['id'] for review in data['results']])
+            previous, url = data['previous'], data['next']
+        expected = list(
+            Review.objects.filter(title=title)
+            .order_by('-pub_date', '-id').values_list('id', flat=True)
+        )
+        assert ids == expected, (
+            'Проверьте, что курсорная пагинация отзывов проходит все '
+            'записи по убыванию (pub_date, id) без пропусков и повторов.'
+        )
+        assert response.json()['results'][0]['id'] == expected[0]
+        back = []
+        while previous:
+            data = client.get(previous).json()
+            back.append([review['id'] for review in data['results']])
+            previous = data['previous']
+        assert back == pages[-2::-1], (
+            'Проверьте, что ссылки `previous` курсорной пагинации '
+            'возвращают те же страницы.'
+        )
+
+    def test_06_titles_page_size_and_count(self, client, catalog,
+                                           django_assert_num_queries,
+                                           monkeypatch):
+        # Количество считается SQL-запросом, без битовых карт.
+        monkeypatch.setattr(title_bitmaps, 'match', lambda params: None)
+        url = '/api/v1/titles/'
+        response = client.get(url, {'page_size': 500})
+        assert len(response.json()['results']) == 100, (
+            'Проверьте, что размер страницы `page_size` ограничен сверху.'
+        )
+
+        # Без COUNT: произведения с категориями и жанры.
+        with django_assert_num_queries(2):
+            response = client.get(url, {'page_size': 10, 'count': 'false'})
+        data = response.json()
+        assert 'count' not in data and data['next'], (
+            'Проверьте, что при `count=false` ответ не содержит общего '
+            'количества, но содержит ссылку на следующую страницу.'
+        )
+        last_page = client.get(
+            url, {'page_size': 10, 'count': 'false', 'page': 10}
+        ).json()
+        assert last_page['next'] is None and last_page['previous']
+
+        with django_assert_num_queries(3):
+            client.get(url, {'year': 2000})
+        # Количество уже в кэше.
+        with django_assert_num_queries(2):
+            response = client.get(url, {'year': 2000, 'page': 2})
+        assert response.json()['count'] == 100
+
+        Title.objects.create(name='Новое', year=2000)
+        response = client.get(url, {'year': 2000})
+        assert response.json()['count'] == 101, (
+            'Проверьте, что закэшированное количество сбрасывается при '
+            'изменении данных.'
+        )
+
+    def test_07_titles_sparse_fields(self, client, catalog,
+                                     django_assert_num_queries):
+        url = '/api/v1/titles/'
+        # COUNT и произведения без категорий и жанров.
+        with django_assert_num_queries(2):
+            response = client.get(url, {'fields': 'id,name'})
+        assert set(response.json()['results'][0]) == {'id', 'name'}, (
+            f'Проверьте, что `{url}?fields=` оставляет в ответе только '
+            'перечисленные поля.'
+        )
+        with django_assert_num_queries(2):
+            response = client.get(url, {'omit': 'genre,description'})
+        title = response.json()['results'][0]
+        assert 'genre' not in title and 'category' in title, (
+            f'Проверьте, что `{url}?omit=` убирает из ответа '
+            'перечисленные поля.'
+        )
+
+    def test_08_reviews_sparse_fields(self, client, discussion,
+                                      django_assert_num_queries):
+        title, review = discussion
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        with django_assert_num_queries(3):
+            response = client.get(url, {'omit': 'author,title'})
+        assert set(response.json()['results'][0]) == {
+            'id', 'text', 'score', 'pub_date'
+        }
+        with django_assert_num_queries(3):
+            response = client.get(f'{url}{review.id}/comments/',
+                                  {'fields': 'id,text'})
+        assert set(response.json()['results'][0]) == {'id', 'text'}
+
+    def test_09_title_genres_bulk_linking(self, admin_client, catalog,
+                                          django_assert_num_queries):
+        slugs = [f'genre-{idx}' for idx in range(3)]
+        data = {'name': 'Новое', 'year': 2000, 'genre': slugs,
+                'category': 'films'}
+        # Пользователь, все жанры одним запросом, категория, BEGIN,
+        # произведение, проверка и вставка связей, жанры для ответа.
+        with django_assert_num_queries(8):
+            response = admin_client.post('/api/v1/titles/', data=data)
+        assert response.status_code == 201
+        title_id = response.json()['id']
+        kept = GenreTitle.objects.get(title_id=title_id, genre__slug=slugs[0])
+
+        response = admin_client.patch(f'/api/v1/titles/{title_id}/',
+                                      data={'genre': slugs[:1]})
+        assert response.json()['genre'] == slugs[:1]
+        assert list(
+            GenreTitle.objects.filter(title_id=title_id)
+        ) == [kept], (
+            'Проверьте, что при изменении жанров произведения неизменные '
+            'связи с жанрами не пересоздаются.'
+        )
+
+    def test_10_conditional_get(self, client, catalog,
+                                django_assert_num_queries):
+        for url in ('/api/v1/categories/', '/api/v1/genres/',
+                    '/api/v1/titles/', f'/api/v1/titles/{catalog[0].id}/'):
+            response = client.get(url)
+            etag = response['ETag']
+            assert etag and response['Last-Modified'], (
+                f'Проверьте, что ответ на GET-запрос к `{url}` содержит '
+                'заголовки ETag и Last-Modified.'
+            )
+            with django_assert_num_queries(0):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304, (
+                f'Проверьте, что GET-запрос к `{url}` с актуальным '
+                'If-None-Match возвращает ответ со статусом 304.'
+            )
+
+        url = '/api/v1/titles/'
+        etag = client.get(url)['ETag']
+        Category.objects.create(name='Книги', slug='books')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response['ETag'] != etag, (
+            f'Проверьте, что ETag ответа `{url}` меняется при изменении '
+            'данных.'
+        )
+        etag = client.get(url, {'page': 2})['ETag']
+        assert etag != response['ETag']
+
+    def test_11_categories_and_genres_cache(self, client, admin_client,
+                                            catalog,
+                                            django_assert_num_queries):
+        for url, model, data, search in (
+            ('/api/v1/categories/', Category,
+             {'name': 'Книги', 'slug': 'books'}, 'и'),
+            ('/api/v1/genres/', Genre,
+             {'name': 'Жанр рока', 'slug': 'rock'}, 'Жанр'),
+        ):
+            count = client.get(url, {'search': search}).json()['count']
+            with django_assert_num_queries(0):
+                response = client.get(url, {'search': search})
+            assert response.json()['count'] == count, (
+                f'Проверьте, что повторный GET-запрос к `{url}` отдаётся '
+                'из кэша без запросов к базе.'
+            )
+            model.objects.create(**data)
+            response = client.get(url, {'search': search})
+            assert response.json()['count'] == count + 1, (
+                f'Проверьте, что кэш `{url}` сбрасывается при изменении '
+                'данных.'
+            )
+
+        stats = admin_client.get('/api/v1/cache-stats/').json()
+        assert stats['categories'] == {
+            'hits': 1, 'misses': 2, 'stale': 0, 'coalesced': 0
+        }
+        assert stats['genres'] == {
+            'hits': 1, 'misses': 2, 'stale': 0, 'coalesced': 0
+        }
+
+    def test_12_title_detail_cache(self, client, admin_client, user_client,
+                                   catalog, django_assert_num_queries):
+        title = catalog[0]
+        url = f'/api/v1/titles/{title.id}/'
+        expected = client.get(url).json()
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response.json() == expected, (
+            f'Проверьте, что повторный GET-запрос к `{url}` отдаётся из '
+            'кэша без запросов к базе.'
+        )
+
+        create_single_review(user_client, title.id, 'Отлично', 8)
+        assert client.get(url).json()['rating'] == 8, (
+            f'Проверьте, что кэш `{url}` сбрасывается при новом отзыве.'
+        )
+        admin_client.patch('/api/v1/titles/{}/'.format(title.id),
+                           data={'genre': ['genre-1']})
+        assert [genre['slug'] for genre in client.get(url).json()['genre']] == [
+            'genre-1'
+        ]
+        Genre.objects.filter(slug='genre-1').get().delete()
+        assert client.get(url).json()['genre'] == []
+        category = Category.objects.get()
+        category.name = 'Кино'
+        category.save()
+        assert client.get(url).json()['category']['name'] == 'Кино', (
+            f'Проверьте, что кэш `{url}` сбрасывается при изменении '
+            'категории произведения.'
+        )
+        other = client.get(f'/api/v1/titles/{catalog[1].id}/').json()
+        assert other['category']['name'] == 'Кино'
+
+        padded_url = f'/api/v1/titles/0{title.id}/'
+        assert client.get(padded_url).json()['name'] == title.name
+        admin_client.patch(url, data={'name': 'Новое название'})
+        assert client.get(padded_url).json()['name'] == 'Новое название', (
+            f'Проверьте, что `{padded_url}` и `{url}` кэшируются под одним '
+            'ключом и сбрасываются вместе.'
+        )
+
+    def test_13_single_flight(self, settings):
+        settings.RESPONSE_CACHE_TTL = {
+            'titles': {'fresh': 60, 'stale': 60}
+        }
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return len(calls)
+
+        def request():
+            results.append(get_or_compute(cache, 'hot', compute, 'titles'))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1, (
+            'Проверьте, что одновременные промахи по одному ключу '
+            'пересчитывает только один запрос.'
+        )
+        assert results == [1] * 5
+
+        settings.RESPONSE_CACHE_TTL = {
+            'titles': {'fresh': 0, 'stale': 60}
+        }
+        cache.set('hot', (time.time() - 1, 1), 60)
+        cache.add('hot:lock', 1)
+        assert get_or_compute(cache, 'hot', compute, 'titles') == 1, (
+            'Проверьте, что пока значение пересчитывается, отдаётся '
+            'устаревшее.'
+        )
+        cache.delete('hot:lock')
+        assert get_or_compute(cache, 'hot', compute, 'titles') == 2
+        assert get_stats()['titles'] == {
+            'hits': 0, 'misses': 2, 'stale': 1, 'coalesced': 4
+        }
+
+    def test_14_title_facets(self, client, catalog):
+        other = Category.objects.create(name='Книга', slug='books')
+        Title.objects.filter(
+            pk__in=[title.pk for title in catalog[:10]]
+        ).update(category=other, year=1999)
+        GenreTitle.objects.filter(
+            title__in=catalog[:30], genre__slug='genre-0'
+        ).delete()
+        url = '/api/v1/titles/'
+        # Битовые карты строятся при первом запросе с фильтром.
+        client.get(url, {'genre': 'genre-1'})
+
+        with CaptureQueriesContext(connection) as plain:
+            client.get(url, {'genre': 'genre-1'})
+        with CaptureQueriesContext(connection) as faceted:
+            response = client.get(url, {'genre': 'genre-1', 'page': 2,
+                                        'facets': 'genre,category,year'})
+        assert len(faceted) == len(plain) + 3, (
+            f'Проверьте, что фасеты `{url}?facets=` считаются одним '
+            'запросом с группировкой на фасет.'
+        )
+        assert response.json()['facets'] == {
+            'genre': [
+                {'slug': 'genre-1', 'name': 'Жанр 1', 'count': 100},
+                {'slug': 'genre-2', 'name': 'Жанр 2', 'count': 100},
+                {'slug': 'genre-0', 'name': 'Жанр 0', 'count': 70},
+            ],
+            'category': [
+                {'slug': 'films', 'name': 'Фильм', 'count': 90},
+                {'slug': 'books', 'name': 'Книга', 'count': 10},
+            ],
+            'year': [
+                {'value': 1999, 'count': 10},
+                {'value': 2000, 'count': 90},
+            ],
+        }, (
+            f'Проверьте, что `{url}?facets=` возвращает количество '
+            'отфильтрованных произведений по значениям фасетов.'
+        )
+
+        with CaptureQueriesContext(connection) as cached:
+            client.get(url, {'genre': 'genre-1', 'ordering': '-year',
+                             'facets': 'genre,category,year'})
+        assert len(cached) == len(plain), (
+            f'Проверьте, что фасеты `{url}` кэшируются по параметрам '
+            'фильтра.'
+        )
+        response = client.get(url, {'category': 'books', 'facets': 'year'})
+        assert response.json()['facets'] == {
+            'year': [{'value': 1999, 'count': 10}]
+        }
+        response = client.get(url, {'search': 'произведение 1',
+                                    'facets': 'genre,category,year'})
+        assert response.status_code == 200, (
+            f'Проверьте, что фасеты `{url}` работают вместе с поиском.'
+        )
+        found = Title.objects.filter(name__regex=r'^Произведение 1\d?$')
+        books = found.filter(category=other).count()
+        assert response.json()['count'] == found.count() == 11
+        assert response.json()['facets'] == {
+            'genre': [
+                {'slug': 'genre-1', 'name': 'Жанр 1', 'count': 11},
+                {'slug': 'genre-2', 'name': 'Жанр 2', 'count': 11},
+            ],
+            'category': sorted([
+                {'slug': 'films', 'name': 'Фильм', 'count': 11 - books},
+                {'slug': 'books', 'name': 'Книга', 'count': books},
+            ], key=lambda row: (-row['count'], row['name'])),
+            'year': [
+                {'value': 1999, 'count': books},
+                {'value': 2000, 'count': 11 - books},
+            ],
+        }
+        response = client.get(url, {'facets': 'rating'})
+        assert response.status_code == 400
+
+    def test_15_title_multi_value_filters(self, client, catalog):
+        other = Category.objects.create(name='Книга', slug='books')
+        Category.objects.create(name='Музыка', slug='music')
+        Title.objects.filter(
+            pk__in=[title.pk for title in catalog[:20]]
+        ).update(category=other, year=1990)
+        GenreTitle.objects.filter(
+            title__in=catalog[:50], genre__slug='genre-0'
+        ).delete()
+        url = '/api/v1/titles/'
+
+        for params, count in (
+            ({'genre': 'genre-0,genre-1'}, 100),
+            ({'genre': 'genre-0,genre-1', 'genre_mode': 'all'}, 50),
+            ({'genre': 'genre-0,unknown', 'genre_mode': 'all'}, 0),
+            ({'genre': 'genre-0,unknown'}, 50),
+            ({'category': 'books,music'}, 20),
+            ({'category': 'unknown'}, 0),
+            ({'category': 'books,unknown'}, 20),
+            ({'category': 'books,films', 'year_min': 1995}, 80),
+            ({'year_min': 1985, 'year_max': 1995}, 20),
+        ):
+            response = client.get(url, {**params, 'page_size': 100})
+            data = response.json()
+            ids = [title['id'] for title in data['results']]
+            assert data['count'] == count == len(set(ids)) == len(ids), (
+                f'Проверьте фильтр `{url}` с параметрами {params}: '
+                'произведения не должны повторяться.'
+            )
+        response = client.get(url, {'genre': 'genre-0', 'genre_mode': 'x'})
+        assert response.status_code == 400
+
+    def test_16_title_bitmap_filters(self, client, admin_client, catalog,
+                                     settings, django_assert_num_queries):
+        GenreTitle.objects.filter(
+            title__in=catalog[:40], genre__slug='genre-0'
+        ).delete()
+        url = '/api/v1/titles/'
+        params = {'genre': 'genre-0,genre-1', 'genre_mode': 'all',
+                  'year_min': 1990, 'category': 'films'}
+        assert client.get(url, params).json()['count'] == 60
+        assert not title_bitmaps.is_stale()
+
+        # Без COUNT: количество и id из битовых карт, затем страница
+        # произведений и их жанры.
+        with django_assert_num_queries(2):
+            response = client.get(url, {**params, 'page': 2})
+        assert response.json()['count'] == 60, (
+            f'Проверьте, что `{url}` считает количество по битовым картам.'
+        )
+
+        data = {'name': 'Новое', 'year': 2000, 'category': 'films',
+                'genre': ['genre-0', 'genre-1']}
+        title_id = admin_client.post(url, data=data).json()['id']
+        assert not title_bitmaps.is_stale(), (
+            'Проверьте, что битовые карты обновляются сигналами.'
+        )
+        assert client.get(url, params).json()['count'] == 61
+        admin_client.patch(f'{url}{title_id}/', data={'year': 1980})
+        assert client.get(url, params).json()['count'] == 60
+        assert client.get(url, {'year': 1980}).json()['count'] == 1
+        Title.objects.create(name='Без категории', year=1980)
+        assert not title_bitmaps.is_stale()
+        response = client.get(url, {'category': 'unknown'})
+        assert response.json()['count'] == 0, (
+            'Проверьте, что неизвестная категория не находит произведения '
+            'без категории.'
+        )
+        assert client.get(url, {'year': 1980}).json()['count'] == 2
+
+        settings.TITLE_BITMAP_MAX_IDS = 10
+        response = client.get(url, {**params, 'ordering': '-year',
+                                    'page_size': 20})
+        assert response.json()['count'] == 60
+        assert len(response.json()['results']) == 20
+
+        title_bitmaps.invalidate()
+        assert title_bitmaps.match(params) is None, (
+            'Проверьте, что устаревшие битовые карты не используются.'
+        )
+        Genre.objects.get(slug='genre-0').delete()
+        assert client.get(url, params).json()['count'] == 0
+
+    def test_17_titles_bulk_create_queries(self, admin_client, client,
+                                           catalog):
+        url = '/api/v1/titles/'
+        client.get(url, {'genre': 'genre-0'})
+        client.get(f'{url}autocomplete/', {'name': 'про'})
+
+        def bulk_create(size):
+            items = [{'name': f'Пачка {size}-{idx}', 'year': 2001,
+                      'genre': ['genre-0', 'genre-1'], 'category': 'films'}
+                     for idx in range(size)]
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.post(f'{url}bulk/', data=items,
+                                             format='json')
+            assert response.status_code == 201
+            return len(context), [row['id'] for row in response.json()]
+
+        small, _ = bulk_create(5)
+        large, ids = bulk_create(50)
+        assert large == small, (
+            f'Проверьте, что `{url}bulk/` создаёт произведения пачкой: '
+            'число запросов не должно зависеть от размера пачки.'
+        )
+        assert len(set(ids)) == 50
+        assert GenreTitle.objects.filter(title_id__in=ids).count() == 100
+        assert not title_bitmaps.is_stale()
+        response = client.get(url, {'year': 2001, 'genre': 'genre-1'})
+        assert response.json()['count'] == 55
+        Title.objects.filter(pk__in=ids).delete()
+        _, new_ids = bulk_create(5)
+        assert min(new_ids) > max(ids), (
+            'Проверьте, что id удалённых произведений не переиспользуются.'
+        )
+
+    def test_18_generations_bumped_on_commit(self, client, catalog):
+        url = '/api/v1/titles/'
+        with transaction.atomic():
+            Title.objects.create(name='Новое', year=1999,
+                                 category=catalog[0].category)
+            # Ответ, собранный до коммита (в другом процессе он был бы
+            # без нового произведения).
+            etag = client.get(url, {'year': 1999})['ETag']
+            generations = get_generations((Title,))
+        assert get_generations((Title,)) != generations, (
+            'Проверьте, что поколение модели меняется и после коммита.'
+        )
+        response = client.get(url, {'year': 1999}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что ETag, выданный до коммита записи, не '
+            'принимается после коммита.'
+        )
+
+    def test_19_bitmaps_stale_after_foreign_write(self, client, catalog):
+        url = '/api/v1/titles/'
+        client.get(url, {'genre': 'genre-0'})
+        assert not title_bitmaps.is_stale()
+        # Запись другого процесса: данные и поколение без сигналов
+        # этого процесса.
+        Title.objects.bulk_create([Title(name='Чужое', year=1888)])
+        cache.incr(generation_key(Title))
+        Title.objects.create(name='Своё', year=1888)
+        assert title_bitmaps.is_stale(), (
+            'Проверьте, что битовые карты не считаются актуальными после '
+            'записи другого процесса, которую они не учли.'
+        )
+        assert client.get(url, {'year': 1888}).json()['count'] == 2
+
+    def test_20_autocomplete_stale_after_foreign_write(self, client,
+                                                       catalog, settings):
+        url = '/api/v1/titles/autocomplete/'
+        client.get(url, {'name': 'про'})
+        Title.objects.bulk_create([Title(name='Чужое', year=1888)])
+        cache.incr(generation_key(Title))
+        Title.objects.create(name='Своё', year=1888)
+        assert title_index.is_stale(), (
+            'Проверьте, что индекс автодополнения не считается актуальным '
+            'после записи другого процесса, которую он не учёл.'
+        )
+        settings.AUTOCOMPLETE_REBUILD_INTERVAL = 0
+        names = [row['name'] for row in client.get(url, {'name': 'чуж'}).json()]
+        assert names == ['Чужое'], (
+            'Проверьте, что устаревший индекс автодополнения '
+            'перестраивается.'
+        )
+
+    def test_21_bitmaps_build_once(self, catalog, monkeypatch):
+        index = TitleBitmapIndex()
+        load = index.load
+        loads = []
+        started, release = threading.Event(), threading.Event()
+
+        def slow_load():
+            loads.append(1)
+            started.set()
+            release.wait(5)
+            return load()
+
+        monkeypatch.setattr(index, 'load', slow_load)
+        threads = [threading.Thread(target=index.ensure_built)
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        # Запись этого процесса во время сборки.
+        index.refresh([catalog[0].pk])
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(loads) == 1, (
+            'Проверьте, что индекс собирает из БД только один поток.'
+        )
+        assert index.is_built and index.is_stale(), (
+            'Проверьте, что запись во время сборки оставляет индекс '
+            'устаревшим.'
+        )